@@ -0,0 +1,243 @@
+"""
+Rating Replay and Parameter Sweep
+=================================
+
+Replays the whole match history in chronological order under one or more
+rating parameter sets and reports how well each set predicted the results
+before they happened: mean log-loss of the predicted blue win probability
+(lower is better), accuracy, and the Brier score.
+
+Models:
+    trueskill  - the live rating engine (cogs/utils/rating_engine.py);
+                 sweeps --beta, --tau, --sigma
+    elo        - team-average Elo; sweeps --k, --scale
+    winrate    - calculate_adjusted_mmr's win-rate adjustment; sweeps
+                 --max-adjustment and --tiers (games:confidence steps)
+
+Parameter sets are replayed in parallel across CPU cores; each worker
+receives the history once.
+
+Run from the repository root:
+    python -m benchmarks.rating_replay --model trueskill --beta 100,150,200 --tau 0,3,10
+    python -m benchmarks.rating_replay --model elo --k 16,32,64
+    python -m benchmarks.rating_replay --model winrate --max-adjustment 100,200,300 \\
+        --tiers "5:0.1,10:0.2,15:0.4,25:0.6,35:0.8" --tiers "10:0.5,20:1.0"
+
+File: benchmarks/rating_replay.py
+Author: Juan Dodam
+Version: 1.0.0
+"""
+
+import argparse
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple, Iterable, Any
+
+from cogs.utils import rating_engine
+from cogs.utils.data_manager import DataManager
+
+LEGACY_TIERS = ((5, 0.1), (10, 0.2), (15, 0.4), (25, 0.6), (35, 0.8))
+PROBABILITY_FLOOR = 1e-6
+
+# History shared with every worker process (set by _init_worker)
+_history: Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]] = ([], {})
+
+
+# ===== MODELS =====
+# Each predictor yields the blue win probability of every match before
+# updating on its result, in history order.
+
+def _start_mmr(users: Dict[str, Dict], player: str) -> float:
+    """Tier MMR of a player (DEFAULT_MU if unregistered)."""
+    user = users.get(player)
+    return float(user["mmr"]) if user else float(rating_engine.DEFAULT_MU)
+
+
+def predict_trueskill(matches: List[Dict], users: Dict[str, Dict], beta: float, tau: float,
+                      sigma: float) -> Iterable[float]:
+    """Live rating engine with the given parameters."""
+    params = rating_engine.RatingParams(beta, tau, sigma)
+    ratings: Dict[str, rating_engine.Rating] = {}
+    for match in matches:
+        for player in match["blue_team"] + match["red_team"]:
+            if player not in ratings:
+                ratings[player] = (_start_mmr(users, player), params.initial_sigma)
+        yield rating_engine.win_probability([ratings[p] for p in match["blue_team"]],
+                                            [ratings[p] for p in match["red_team"]], params)
+        ratings.update(rating_engine.rate_match(match["blue_team"], match["red_team"],
+                                                match["winner"], ratings, params))
+
+
+def predict_elo(matches: List[Dict], users: Dict[str, Dict], k: float, scale: float) -> Iterable[float]:
+    """Elo on team-average rating; every player moves by the team's delta."""
+    ratings: Dict[str, float] = {}
+    for match in matches:
+        blue, red = match["blue_team"], match["red_team"]
+        for player in blue + red:
+            ratings.setdefault(player, _start_mmr(users, player))
+        edge = sum(ratings[p] for p in blue) / len(blue) - sum(ratings[p] for p in red) / len(red)
+        probability = 1 / (1 + 10 ** (-edge / scale))
+        yield probability
+        if match["winner"] in ("blue", "red"):
+            delta = k * ((match["winner"] == "blue") - probability)
+            for player in blue:
+                ratings[player] += delta
+            for player in red:
+                ratings[player] -= delta
+
+
+def predict_winrate(matches: List[Dict], users: Dict[str, Dict], max_adjustment: float,
+                    tiers: Tuple[Tuple[int, float], ...], scale: float = 400) -> Iterable[float]:
+    """
+    calculate_adjusted_mmr with its confidence tiers and maximum adjustment
+    as parameters, evaluated on each player's history so far.
+    """
+    games: Dict[str, int] = {}
+    wins: Dict[str, int] = {}
+    
+    def adjusted(player: str) -> float:
+        played = games.get(player, 0)
+        if not played:
+            return _start_mmr(users, player)
+        confidence = next((value for limit, value in tiers if played < limit), 1.0)
+        win_rate = wins.get(player, 0) / played
+        return _start_mmr(users, player) + (win_rate - 0.5) * 2 * max_adjustment * confidence
+    
+    for match in matches:
+        blue, red = match["blue_team"], match["red_team"]
+        edge = sum(map(adjusted, blue)) / len(blue) - sum(map(adjusted, red)) / len(red)
+        yield 1 / (1 + 10 ** (-edge / scale))
+        for team, side in ((blue, "blue"), (red, "red")):
+            for player in team:
+                games[player] = games.get(player, 0) + 1
+                wins[player] = wins.get(player, 0) + (match["winner"] == side)
+
+
+MODELS = {
+    "trueskill": predict_trueskill,
+    "elo": predict_elo,
+    "winrate": predict_winrate,
+}
+
+
+# ===== EVALUATION =====
+
+def score_predictions(matches: List[Dict], predictions: Iterable[float],
+                      warmup: int = 0) -> Dict[str, float]:
+    """Mean log-loss, accuracy and Brier score, skipping the first `warmup` matches."""
+    count = log_loss = brier = correct = 0
+    for index, (match, probability) in enumerate(zip(matches, predictions)):
+        if index < warmup or match["winner"] not in ("blue", "red"):
+            continue
+        blue_won = match["winner"] == "blue"
+        probability = min(max(probability, PROBABILITY_FLOOR), 1 - PROBABILITY_FLOOR)
+        log_loss -= math.log(probability if blue_won else 1 - probability)
+        brier += (probability - blue_won) ** 2
+        correct += (probability > 0.5) == blue_won
+        count += 1
+    if not count:
+        return {"matches": 0, "log_loss": float("nan"), "accuracy": float("nan"), "brier": float("nan")}
+    return {"matches": count, "log_loss": log_loss / count, "accuracy": correct / count, "brier": brier / count}
+
+
+def _init_worker(matches: List[Dict], users: Dict[str, Dict]):
+    """Receive the history once per worker process."""
+    global _history
+    _history = (matches, users)
+
+
+def evaluate(job: Tuple[str, Dict[str, Any], int]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """Replay the shared history under one parameter set."""
+    model, params, warmup = job
+    matches, users = _history
+    return params, score_predictions(matches, MODELS[model](matches, users, **params), warmup)
+
+
+def sweep(matches: List[Dict], users: Dict[str, Dict], model: str, param_sets: List[Dict[str, Any]],
+          warmup: int = 0, workers: int = None) -> List[Tuple[Dict[str, Any], Dict[str, float]]]:
+    """
+    Evaluate every parameter set, in parallel across processes.
+    
+    Returns:
+        List of (params, scores), lowest log-loss first
+    """
+    jobs = [(model, params, warmup) for params in param_sets]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        _init_worker(matches, users)
+        results = [evaluate(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(matches, users)) as executor:
+            results = list(executor.map(evaluate, jobs))
+    return sorted(results, key=lambda result: result[1]["log_loss"])
+
+
+def load_history(data_dir: Path) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """Matches in chronological order and users, read through the configured storage."""
+    dm = DataManager(Path(data_dir))
+    try:
+        matches = [dict(match) for match in dm.get_matches_between()]
+        users = {name: dict(user) for name, user in dm.get_all_users().items()}
+    finally:
+        dm.close()
+    return matches, users
+
+
+# ===== CLI =====
+
+def _numbers(text: str) -> List[float]:
+    return [float(value) for value in text.split(",")]
+
+
+def _tiers(text: str) -> Tuple[Tuple[int, float], ...]:
+    return tuple((int(limit), float(value)) for limit, value in
+                 (step.split(":") for step in text.split(",")))
+
+
+def parameter_grid(args) -> List[Dict[str, Any]]:
+    """Every combination of the swept values for the chosen model."""
+    if args.model == "trueskill":
+        axes = {"beta": args.beta, "tau": args.tau, "sigma": args.sigma}
+    elif args.model == "elo":
+        axes = {"k": args.k, "scale": args.scale}
+    else:
+        axes = {"max_adjustment": args.max_adjustment, "tiers": args.tiers or [LEGACY_TIERS]}
+    return [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+
+
+def main():
+    """Sweep the requested grid and print a table, best log-loss first."""
+    defaults = rating_engine.default_params()
+    parser = argparse.ArgumentParser(description="Replay match history under rating parameter sets.")
+    parser.add_argument("--data-dir", default="data", help="Data directory (default: data)")
+    parser.add_argument("--model", choices=sorted(MODELS), default="trueskill")
+    parser.add_argument("--beta", type=_numbers, default=[defaults.beta])
+    parser.add_argument("--tau", type=_numbers, default=[defaults.tau])
+    parser.add_argument("--sigma", type=_numbers, default=[defaults.initial_sigma])
+    parser.add_argument("--k", type=_numbers, default=[32.0])
+    parser.add_argument("--scale", type=_numbers, default=[400.0])
+    parser.add_argument("--max-adjustment", type=_numbers, default=[200.0])
+    parser.add_argument("--tiers", type=_tiers, action="append",
+                        help="games:confidence steps, e.g. 5:0.1,10:0.2 (repeatable)")
+    parser.add_argument("--warmup", type=int, default=0, help="Matches to replay before scoring")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    parser.add_argument("--top", type=int, default=20, help="Rows to print")
+    args = parser.parse_args()
+    
+    matches, users = load_history(args.data_dir)
+    param_sets = parameter_grid(args)
+    print(f"Replaying {len(matches)} matches under {len(param_sets)} {args.model} parameter sets")
+    
+    results = sweep(matches, users, args.model, param_sets, args.warmup, args.workers)
+    print(f"{'log-loss':>9} {'accuracy':>9} {'brier':>7} {'matches':>8} | params")
+    for params, scores in results[:args.top]:
+        print(f"{scores['log_loss']:>9.4f} {scores['accuracy']:>9.1%} {scores['brier']:>7.4f} "
+              f"{scores['matches']:>8} | {params}")
+
+
+if __name__ == "__main__":
+    main()
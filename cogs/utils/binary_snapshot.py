@@ -0,0 +1,287 @@
+"""
+Binary Snapshot Format for Users and Matches
+============================================
+
+Compact columnar snapshot used by JsonStorage when settings.SNAPSHOT_FORMAT
+is "binary". Every string (player names, tiers, positions, dates, match ids)
+is stored once in an interned string table and referenced by index, and
+each field is stored as one packed integer column (array module), so a
+snapshot loads with a handful of bulk reads instead of parsing JSON.
+
+Layout (little-endian):
+
+    magic "LANFSNP1"
+    string table : count, utf-8 byte lengths[count], utf-8 blob
+    users        : count, name/tier/rank/main/sub columns (string ids),
+                   mmr/wins/losses/total_games columns
+    matches      : count, match_id/date/winner/mvp columns (string ids,
+                   -1 = None), blue/red team sizes, flat player id column
+    fallback     : JSON blob with extra fields and records that don't fit
+                   the columns, so the round trip is always lossless
+
+File: cogs/utils/binary_snapshot.py
+Author: Juan Dodam
+Version: 1.0.0
+"""
+
+import json
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+
+MAGIC = b"LANFSNP1"
+
+USER_STRING_FIELDS = ("tier", "rank", "main_position", "sub_position")
+USER_INT_FIELDS = ("mmr", "wins", "losses", "total_games")
+USER_FIELDS = USER_STRING_FIELDS + USER_INT_FIELDS
+MATCH_FIELDS = ("date", "blue_team", "red_team", "winner", "mvp")
+
+
+class _StringTable:
+    """Interns strings to sequential integer ids."""
+    
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+    
+    def intern(self, value) -> int:
+        """Get the id of a string (None -> -1)."""
+        if value is None:
+            return -1
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+def _is_int(value) -> bool:
+    """Check for a real int that fits a signed 32-bit column."""
+    return type(value) is int and -2**31 <= value < 2**31
+
+
+def _user_fits_columns(record: Dict[str, Any]) -> bool:
+    """Check that a user record can be stored in the fixed columns."""
+    return (all(isinstance(record.get(f), str) for f in USER_STRING_FIELDS)
+            and all(_is_int(record.get(f)) for f in USER_INT_FIELDS))
+
+
+def _match_fits_columns(record: Dict[str, Any]) -> bool:
+    """Check that a match record can be stored in the fixed columns."""
+    teams_ok = all(
+        isinstance(record.get(team), list) and len(record[team]) < 256
+        and all(isinstance(p, str) for p in record[team])
+        for team in ("blue_team", "red_team")
+    )
+    scalars_ok = all(
+        f in record and (record[f] is None or isinstance(record[f], str))
+        for f in ("date", "winner", "mvp")
+    )
+    return teams_ok and scalars_ok
+
+
+def _pack_array(typecode: str, values) -> bytes:
+    """Pack integers as a little-endian array with a length prefix."""
+    column = array(typecode, values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return struct.pack("<I", len(column)) + column.tobytes()
+
+
+class _Reader:
+    """Sequential reader over a snapshot buffer."""
+    
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+    
+    def read(self, size: int) -> memoryview:
+        """Read the next `size` bytes."""
+        chunk = self.data[self.offset:self.offset + size]
+        if len(chunk) != size:
+            raise ValueError("Truncated snapshot")
+        self.offset += size
+        return chunk
+    
+    def uint(self) -> int:
+        """Read an unsigned 32-bit integer."""
+        return struct.unpack("<I", self.read(4))[0]
+    
+    def array(self, typecode: str) -> array:
+        """Read a length-prefixed integer column."""
+        count = self.uint()
+        column = array(typecode)
+        column.frombytes(self.read(count * column.itemsize))
+        if sys.byteorder != "little":
+            column.byteswap()
+        return column
+    
+    def blob(self) -> bytes:
+        """Read a length-prefixed byte string."""
+        return bytes(self.read(self.uint()))
+
+
+def encode(users: Dict[str, Any], matches: Dict[str, Any]) -> bytes:
+    """Encode users and matches into the binary snapshot format."""
+    strings = _StringTable()
+    fallback = {"users": {}, "matches": {}, "user_extra": {}, "match_extra": {}}
+    
+    # Users
+    user_columns = {f: [] for f in ("name",) + USER_FIELDS}
+    for name, record in users.items():
+        if not _user_fits_columns(record):
+            fallback["users"][name] = record
+            continue
+        user_columns["name"].append(strings.intern(name))
+        for field in USER_STRING_FIELDS:
+            user_columns[field].append(strings.intern(record[field]))
+        for field in USER_INT_FIELDS:
+            user_columns[field].append(record[field])
+        extra = {k: v for k, v in record.items() if k not in USER_FIELDS}
+        if extra:
+            fallback["user_extra"][name] = extra
+    
+    # Matches
+    match_columns = {f: [] for f in ("match_id", "date", "winner", "mvp", "blue_size", "red_size")}
+    players = []
+    for match_id, record in matches.items():
+        if not _match_fits_columns(record):
+            fallback["matches"][match_id] = record
+            continue
+        match_columns["match_id"].append(strings.intern(match_id))
+        for field in ("date", "winner", "mvp"):
+            match_columns[field].append(strings.intern(record[field]))
+        match_columns["blue_size"].append(len(record["blue_team"]))
+        match_columns["red_size"].append(len(record["red_team"]))
+        players.extend(strings.intern(p) for p in record["blue_team"])
+        players.extend(strings.intern(p) for p in record["red_team"])
+        extra = {k: v for k, v in record.items() if k not in MATCH_FIELDS}
+        if extra:
+            fallback["match_extra"][match_id] = extra
+    
+    encoded = [s.encode("utf-8") for s in strings.strings]
+    parts = [
+        MAGIC,
+        _pack_array("I", (len(s) for s in encoded)),
+        b"".join(encoded),
+        _pack_array("i", user_columns["name"]),
+    ]
+    parts += [_pack_array("i", user_columns[f]) for f in USER_FIELDS]
+    parts += [_pack_array("i", match_columns[f]) for f in ("match_id", "date", "winner", "mvp")]
+    parts += [_pack_array("B", match_columns["blue_size"]),
+              _pack_array("B", match_columns["red_size"]),
+              _pack_array("i", players)]
+    
+    fallback_blob = json.dumps(fallback, ensure_ascii=False).encode("utf-8")
+    parts += [struct.pack("<I", len(fallback_blob)), fallback_blob]
+    return b"".join(parts)
+
+
+def decode(data: bytes) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Decode a binary snapshot into (users, matches)."""
+    if not data.startswith(MAGIC):
+        raise ValueError("Not a binary snapshot")
+    reader = _Reader(data)
+    reader.read(len(MAGIC))
+    
+    lengths = reader.array("I")
+    blob = bytes(reader.read(sum(lengths)))
+    strings = []
+    offset = 0
+    for length in lengths:
+        strings.append(blob[offset:offset + length].decode("utf-8"))
+        offset += length
+    
+    def lookup(string_id):
+        return strings[string_id] if string_id >= 0 else None
+    
+    name_column = reader.array("i")
+    user_columns = [reader.array("i") for _ in USER_FIELDS]
+    match_id_column, date_column, winner_column, mvp_column = (reader.array("i") for _ in range(4))
+    blue_sizes = reader.array("B")
+    red_sizes = reader.array("B")
+    player_column = [strings[i] for i in reader.array("i")]
+    fallback = json.loads(reader.blob().decode("utf-8"))
+    
+    # Users: map string columns back through the table, then zip rows
+    columns = [[strings[i] for i in column] if position < len(USER_STRING_FIELDS) else column
+               for position, column in enumerate(user_columns)]
+    users = {strings[name_id]: dict(zip(USER_FIELDS, row))
+             for name_id, row in zip(name_column, zip(*columns))}
+    for name, extra in fallback["user_extra"].items():
+        users[name].update(extra)
+    users.update(fallback["users"])
+    
+    # Matches: team sizes give each match's slice of the flat player column
+    match_ends = list(accumulate(b + r for b, r in zip(blue_sizes, red_sizes)))
+    matches = {}
+    start = 0
+    for match_id_id, date_id, winner_id, mvp_id, blue_size, end in zip(
+            match_id_column, date_column, winner_column, mvp_column, blue_sizes, match_ends):
+        split = start + blue_size
+        matches[strings[match_id_id]] = {
+            "date": lookup(date_id),
+            "blue_team": player_column[start:split],
+            "red_team": player_column[split:end],
+            "winner": lookup(winner_id),
+            "mvp": lookup(mvp_id)
+        }
+        start = end
+    for match_id, extra in fallback["match_extra"].items():
+        matches[match_id].update(extra)
+    matches.update(fallback["matches"])
+    
+    return users, matches
+
+
+def save_snapshot(file_path: Path, users: Dict[str, Any], matches: Dict[str, Any]):
+    """Write a binary snapshot atomically (temp file, then rename)."""
+    file_path = Path(file_path)
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(encode(users, matches))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+def load_snapshot(file_path: Path) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Read a binary snapshot."""
+    with open(file_path, 'rb') as f:
+        return decode(f.read())
+
+
+# ===== CONVERTERS =====
+
+def json_to_snapshot(data_dir: Path, snapshot_path: Path = None) -> Path:
+    """
+    Convert users.json/matches.json (plus journal) into a binary snapshot.
+    
+    Returns:
+        Path: Written snapshot file
+    """
+    from cogs.utils.storage import JsonStorage
+    
+    data_dir = Path(data_dir)
+    snapshot_path = Path(snapshot_path or data_dir / "snapshot.bin")
+    users, matches = JsonStorage(data_dir).load()
+    save_snapshot(snapshot_path, users, matches)
+    return snapshot_path
+
+
+def snapshot_to_json(data_dir: Path):
+    """
+    Write data/snapshot.bin (plus journal) back out as users.json/matches.json.
+    
+    Needed before switching settings.SNAPSHOT_FORMAT back to "json".
+    """
+    from cogs.utils.storage import JsonStorage
+    
+    data_dir = Path(data_dir)
+    users, matches = JsonStorage(data_dir, snapshot_format="binary").load()
+    JsonStorage(data_dir, snapshot_format="json").compact(users, matches)
@@ -2,70 +2,579 @@
 Data Manager for Discord LOL Internal Match Bot
 ==============================================
 
-Handles all data operations for users and matches using JSON files.
+Handles all data operations for users and matches. Persistence is delegated
+to a storage backend (JSON files or SQLite, see cogs/utils/storage.py) selected
+by settings.STORAGE_BACKEND. Data is kept in memory and only reloaded when the
+backend reports a change on disk, so reads are dictionary lookups.
 
 File: cogs/utils/data_manager.py
 Author: Juan Dodam
-Version: 1.0.0
+Version: 2.1.0 - Incremental player ratings
 """
 
-import json
-import os
+import asyncio
+import bisect
+import copy
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import combinations
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Callable, Tuple, Union
+from datetime import datetime, date as Date
+import settings
+from cogs.utils.storage import create_storage, StorageConflictError
+from cogs.utils.records import UserView, MatchView
+from cogs.utils import rating_engine
+
+
+def synchronized(method):
+    """Run a DataManager method while holding the instance lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def transactional(method):
+    """
+    Run a DataManager mutation through mutate(): one atomic commit that is
+    re-run on fresh data if another writer committed first.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.mutate(method, self, *args, **kwargs)
+    return wrapper
 
 
 class DataManager:
-    """Manages user and match data for the LOL internal match bot."""
+    """
+    Manages user and match data for the LOL internal match bot.
+    
+    All public methods are thread-safe. Inside slash command handlers use
+    AsyncDataManager instead so disk I/O never runs on the event loop.
+    
+    Writes are optimistic: a commit only succeeds if the stored data is
+    still what this manager last loaded or wrote (compare-and-swap on the
+    backend signature). When another process or manager got there first
+    the mutation is re-run on the reloaded data, up to settings.COMMIT_RETRIES
+    times, instead of silently overwriting the other change.
+    """
+    
+    # User fields that only ever count up or down; a conflicting write-behind
+    # flush adds its delta to the stored value instead of replacing it
+    COUNTER_FIELDS = frozenset({"wins", "losses", "total_games"})
+    
+    def __init__(self, data_dir: Path = Path("data"), storage=None,
+                 write_behind_delay: Optional[float] = None,
+                 write_behind_max_dirty: Optional[int] = None):
+        """
+        Initialize data manager with a storage backend.
+        
+        Args:
+            data_dir: Directory holding the data files
+            storage: Storage backend (defaults to settings.STORAGE_BACKEND,
+                     opened lazily on first use)
+            write_behind_delay: Seconds to coalesce writes before flushing
+                                (0 writes immediately; defaults to settings)
+            write_behind_max_dirty: Flush early once this many users/matches
+                                    are dirty (defaults to settings)
+        """
+        self.data_dir = Path(data_dir)
+        self._storage = storage
+        self._owns_storage = storage is None
+        self.commit_retries = settings.COMMIT_RETRIES
+        
+        # In-memory copy of the stored data, reloaded when the backend signature changes
+        self._users: Optional[Dict[str, Any]] = None
+        self._matches: Optional[Dict[str, Any]] = None
+        self._signature = None
+        
+        # Bumped on every reload and every committed change (see get_generation)
+        self._generation = 0
+        
+        # Player name -> match ids in chronological order (rebuilt on every reload)
+        self._player_matches: Dict[str, List[str]] = {}
+        
+        # (player, player) sorted name pair -> [games together, wins together],
+        # kept up to date as matches are added and deleted
+        self._pair_stats: Dict[Tuple[str, str], List[int]] = {}
+        
+        # All match ids in chronological order, with their sort keys alongside
+        # for bisecting date ranges and pagination cursors
+        self._match_order: List[str] = []
+        self._match_keys: List[tuple] = []
+        
+        # Guards the in-memory copy when called from executor threads
+        self._lock = threading.RLock()
+        
+        # Keys changed inside the current batch (see batch())
+        self._batch_depth = 0
+        self._pending_users = set()
+        self._pending_matches = set()
+        
+        # Write-behind: committed in memory but not yet flushed to storage
+        self.write_behind_delay = (settings.WRITE_BEHIND_DELAY 
+                                   if write_behind_delay is None else write_behind_delay)
+        self.write_behind_max_dirty = (settings.WRITE_BEHIND_MAX_DIRTY 
+                                       if write_behind_max_dirty is None else write_behind_max_dirty)
+        self._dirty_users = set()
+        self._dirty_matches = set()
+        self._flush_timer: Optional[threading.Timer] = None
+        
+        # Write-behind only: records as last loaded from or flushed to storage,
+        # the base a conflicting flush merges this manager's changes against
+        self._stored_users: Dict[str, Any] = {}
+        self._stored_matches: Dict[str, Any] = {}
+    
+    @property
+    def storage(self):
+        """Storage backend, opened on first use."""
+        if self._storage is None:
+            self._storage = create_storage(
+                settings.STORAGE_BACKEND, self.data_dir, 
+                sqlite_filename=settings.SQLITE_DB_FILENAME,
+                compact_threshold=settings.JOURNAL_COMPACT_THRESHOLD,
+                snapshot_format=settings.SNAPSHOT_FORMAT
+            )
+        return self._storage
+    
+    def _load(self):
+        """Reload data from storage if it changed since the last load or commit."""
+        if self._users is not None and (self._batch_depth > 0 or self.has_unflushed_changes()):
+            return  # Never drop uncommitted batch or write-behind changes
+        
+        signature = self.storage.signature()
+        if self._users is None or signature != self._signature:
+            self._users, self._matches = self.storage.load()
+            self._signature = signature
+            self._remember_stored()
+            self._generation += 1
+            self._rebuild_indexes()
+    
+    # ===== MATCH INDEXES =====
+    
+    @staticmethod
+    def _match_number(match_id: str) -> int:
+        """Numeric part of a match ID (match_012 -> 12)."""
+        digits = match_id.rsplit("_", 1)[-1]
+        return int(digits) if digits.isdigit() else 0
+    
+    def _chronological_key(self, match_id: str):
+        """Sort key ordering matches by date, then by creation order."""
+        match = self._matches[match_id]
+        return match.get("date") or "", self._match_number(match_id), match_id
+    
+    @staticmethod
+    def _date_bounds(start=None, end=None) -> Tuple[tuple, tuple]:
+        """Chronological-key bounds covering the dates start..end (inclusive)."""
+        def to_text(value):
+            return value.strftime("%Y-%m-%d") if isinstance(value, Date) else value
+        
+        # "" sorts before every date and (end, inf) after every match on `end`
+        low = (to_text(start) or "",)
+        high = (to_text(end), float("inf")) if end is not None else (chr(0x10FFFF),)
+        return low, high
+    
+    @staticmethod
+    def _encode_cursor(key: tuple) -> str:
+        """Opaque pagination cursor for a chronological key."""
+        date, number, match_id = key
+        return f"{date}|{number}|{match_id}"
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> tuple:
+        """Chronological key from a pagination cursor."""
+        try:
+            date, number, match_id = cursor.split("|", 2)
+            return date, int(number), match_id
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {cursor!r}") from None
     
-    def __init__(self):
-        """Initialize data manager with file paths."""
-        self.data_dir = Path("data")
-        self.users_file = self.data_dir / "users.json"
-        self.matches_file = self.data_dir / "matches.json"
+    def _rebuild_indexes(self):
+        """Rebuild the match indexes from the loaded matches."""
+        self._player_matches = {}
+        self._pair_stats = {}
+        self._match_keys = sorted(self._chronological_key(match_id) for match_id in self._matches)
+        self._match_order = [key[2] for key in self._match_keys]
+        for match_id in self._match_order:
+            self._index_match(match_id, append=True)
+    
+    def _index_match(self, match_id: str, append: bool = False):
+        """Add a match to the date index and every participant's index entry."""
+        match = self._matches[match_id]
+        if not append:
+            key = self._chronological_key(match_id)
+            position = bisect.bisect(self._match_keys, key)
+            self._match_keys.insert(position, key)
+            self._match_order.insert(position, match_id)
         
-        # Create data directory if it doesn't exist
-        self.data_dir.mkdir(exist_ok=True)
+        for player in match["blue_team"] + match["red_team"]:
+            match_ids = self._player_matches.setdefault(player, [])
+            if append:
+                match_ids.append(match_id)
+            else:
+                bisect.insort(match_ids, match_id, key=self._chronological_key)
+        self._count_pairs(match, 1)
+    
+    def _unindex_match(self, match_id: str):
+        """Remove a match from the date index and every participant's index entry."""
+        match = self._matches[match_id]
+        key = self._chronological_key(match_id)
+        position = bisect.bisect_left(self._match_keys, key)
+        if position < len(self._match_keys) and self._match_keys[position] == key:
+            del self._match_keys[position]
+            del self._match_order[position]
         
-        # Initialize empty files if they don't exist
-        self._initialize_files()
+        for player in match["blue_team"] + match["red_team"]:
+            match_ids = self._player_matches.get(player, [])
+            if match_id in match_ids:
+                match_ids.remove(match_id)
+        self._count_pairs(match, -1)
+    
+    def _count_pairs(self, match: Dict[str, Any], delta: int):
+        """Add (delta=1) or remove (delta=-1) a match's teammate pairs in the pair index."""
+        for side in ("blue", "red"):
+            won = match.get("winner") == side
+            for pair in combinations(sorted(match[f"{side}_team"]), 2):
+                stats = self._pair_stats.setdefault(pair, [0, 0])
+                stats[0] += delta
+                stats[1] += delta * won
+                if stats[0] <= 0:
+                    del self._pair_stats[pair]
     
-    def _initialize_files(self):
-        """Create empty JSON files if they don't exist."""
-        if not self.users_file.exists():
-            self._save_json(self.users_file, {})
-        if not self.matches_file.exists():
-            self._save_json(self.matches_file, {})
+    def _commit(self, changed_users: Iterable[str] = (), changed_matches: Iterable[str] = ()):
+        """
+        Persist changed users/matches and write them through to the cache.
+        
+        Inside a batch the keys are only collected; the batch commits them
+        all at once when it exits. In write-behind mode committed keys are
+        marked dirty and flushed after the delay or dirty-count threshold.
+        """
+        self._pending_users.update(changed_users)
+        self._pending_matches.update(changed_matches)
+        if self._batch_depth > 0:
+            return
+        
+        self._dirty_users |= self._pending_users
+        self._dirty_matches |= self._pending_matches
+        self._pending_users = set()
+        self._pending_matches = set()
+        self._generation += 1
+        
+        if self.write_behind_delay > 0:
+            dirty_count = len(self._dirty_users) + len(self._dirty_matches)
+            if dirty_count < self.write_behind_max_dirty:
+                self._schedule_flush()
+                return
+        
+        self._flush_dirty()
     
-    def _load_json(self, file_path: Path) -> Dict[str, Any]:
-        """Load JSON data from file."""
+    def _flush_dirty(self):
+        """Write all dirty users/matches to storage in one commit."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self.has_unflushed_changes():
+            return
+        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+            signature = self.storage.commit(self._users, self._matches, 
+                                            self._dirty_users, self._dirty_matches,
+                                            expected_signature=self._signature)
+        except StorageConflictError:
+            if self.write_behind_delay > 0:
+                # The mutations were acknowledged long ago and cannot be re-run
+                self._merge_dirty_into_storage()
+                return
+            self._dirty_users.clear()
+            self._dirty_matches.clear()
+            self._users = self._matches = None
+            raise
+        except Exception:
+            if self.write_behind_delay > 0:
+                # Keep the acknowledged changes in memory and retry later
+                self._schedule_flush()
+            else:
+                # Cached copy already holds the failed mutation; force a reload
+                self._dirty_users.clear()
+                self._dirty_matches.clear()
+                self._users = self._matches = None
+            raise
+        
+        self._remember_stored(self._dirty_users, self._dirty_matches)
+        self._dirty_users.clear()
+        self._dirty_matches.clear()
+        self._signature = signature
+    
+    def _remember_stored(self, user_keys: Optional[Iterable[str]] = None,
+                         match_keys: Iterable[str] = ()):
+        """
+        Record the in-memory copy as what storage now holds (write-behind
+        only): every record, or just the given keys after a flush.
+        """
+        if self.write_behind_delay <= 0:
+            return
+        if user_keys is None:
+            self._stored_users = copy.deepcopy(self._users)
+            self._stored_matches = copy.deepcopy(self._matches)
+            return
+        for stored, current, keys in ((self._stored_users, self._users, user_keys),
+                                      (self._stored_matches, self._matches, match_keys)):
+            for key in keys:
+                if key in current:
+                    stored[key] = copy.deepcopy(current[key])
+                else:
+                    stored.pop(key, None)
+    
+    def _merge_dirty_into_storage(self):
+        """
+        Resolve a write-behind conflict: reload the stored data, re-apply
+        this manager's changes to each dirty record field by field (see
+        _merge_record) and commit again.
+        """
+        while True:
+            expected = self.storage.signature()
+            users, matches = self.storage.load()
+            for name in self._dirty_users:
+                self._merge_record(users, self._users, self._stored_users, name)
+            for match_id in self._dirty_matches:
+                self._merge_record(matches, self._matches, self._stored_matches, match_id)
+            try:
+                signature = self.storage.commit(users, matches, self._dirty_users, 
+                                                self._dirty_matches, expected_signature=expected)
+                break
+            except StorageConflictError:
+                continue
+        
+        logging.getLogger("discord_bot").warning(
+            f"⚠️ Write-behind flush raced another writer; merged "
+            f"{len(self._dirty_users)} users and {len(self._dirty_matches)} matches")
+        self._dirty_users.clear()
+        self._dirty_matches.clear()
+        self._users, self._matches = users, matches
+        self._signature = signature
+        self._remember_stored()
+        self._generation += 1
+        self._rebuild_indexes()
+    
+    def _merge_record(self, target: Dict[str, Any], source: Dict[str, Any],
+                      base: Dict[str, Any], key: str):
+        """
+        Re-apply this manager's change to one record in target (the stored data).
+        
+        Only fields that differ from base (the record as last stored) are
+        written, so another writer's changes to other fields survive;
+        COUNTER_FIELDS add their delta. A deletion deletes, and a record
+        created here or deleted by the other writer is copied whole.
+        """
+        mine, before, theirs = source.get(key), base.get(key), target.get(key)
+        if mine is None:
+            target.pop(key, None)
+            return
+        if before is None or theirs is None:
+            target[key] = mine
+            return
+        
+        merged = dict(theirs)
+        for field in set(mine) | set(before):
+            if field not in mine:
+                merged.pop(field, None)
+            elif mine[field] == before.get(field):
+                continue
+            elif field in self.COUNTER_FIELDS and field in before:
+                merged[field] = theirs.get(field, 0) + mine[field] - before[field]
+            else:
+                merged[field] = mine[field]
+        target[key] = merged
     
-    def _save_json(self, file_path: Path, data: Dict[str, Any]):
-        """Save JSON data to file."""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def _schedule_flush(self):
+        """Start the write-behind timer unless one is already pending."""
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.write_behind_delay, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+    
+    def _timed_flush(self):
+        """Write-behind timer callback."""
+        with self._lock:
+            self._flush_timer = None
+            try:
+                self._flush_dirty()
+            except Exception as e:
+                logging.getLogger("discord_bot").error(f"❌ Write-behind flush failed: {e}")
+    
+    def has_unflushed_changes(self) -> bool:
+        """Check if write-behind changes are waiting to be flushed."""
+        return bool(self._dirty_users or self._dirty_matches)
+    
+    @synchronized
+    def flush(self):
+        """Force all write-behind changes to storage now."""
+        self._flush_dirty()
+    
+    @contextmanager
+    def batch(self):
+        """
+        Group several mutations into one atomic write.
+        
+        Every add/update/delete call made inside the block is applied in
+        memory and persisted together when the block exits. If the block
+        raises, nothing is written and the in-memory copy is reloaded;
+        write-behind changes made before the block are kept unflushed.
+        
+        Example:
+            with dm.batch():
+                for name in roster:
+                    dm.add_user(name, ...)
+        """
+        with self._lock:
+            self._load()
+            if self._batch_depth == 0:
+                # Unflushed write-behind records as they were before the batch
+                base = self._copy_dirty()
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._rollback_batch(base)
+                raise
+            
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._commit()
+    
+    def _copy_dirty(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Copies of the unflushed write-behind users/matches (None = deleted)."""
+        return ({name: copy.deepcopy(self._users.get(name)) for name in self._dirty_users},
+                {match_id: copy.deepcopy(self._matches.get(match_id)) for match_id in self._dirty_matches})
+    
+    def _rollback_batch(self, base: Tuple[Dict[str, Any], Dict[str, Any]]):
+        """
+        Undo a failed batch: reload from storage and lay the write-behind
+        records from before the batch back over it, still unflushed.
+        """
+        self._pending_users.clear()
+        self._pending_matches.clear()
+        self._users = self._matches = None
+        dirty_users, dirty_matches = base
+        if not dirty_users and not dirty_matches:
+            return  # Plain reload on next access
+        
+        # The signature stays at the last load/flush: if storage moved on,
+        # the next flush conflicts and merges instead of overwriting it
+        self._users, self._matches = self.storage.load()
+        for target, stored, records in ((self._users, self._stored_users, dirty_users),
+                                        (self._matches, self._stored_matches, dirty_matches)):
+            for key, record in records.items():
+                if record is None:
+                    target.pop(key, None)
+                else:
+                    target[key] = record
+            # Records not dirty now match storage again
+            for key in set(target) | set(stored):
+                if key not in records:
+                    if key in target:
+                        stored[key] = copy.deepcopy(target[key])
+                    else:
+                        stored.pop(key, None)
+        self._dirty_users, self._dirty_matches = set(dirty_users), set(dirty_matches)
+        self._generation += 1
+        self._rebuild_indexes()
+    
+    @synchronized
+    def mutate(self, func: Callable, *args, retries: Optional[int] = None, **kwargs):
+        """
+        Apply func(*args, **kwargs) to the data as one optimistic transaction.
+        
+        func reads and changes data through this manager's methods. If the
+        commit loses a race against another writer, the cache is reloaded
+        and func runs again, so func must only touch data through the
+        manager. Inside an outer batch, func simply joins that batch.
+        
+        Args:
+            func: Mutation to apply
+            retries: Re-runs after a conflict (defaults to settings.COMMIT_RETRIES)
+        
+        Returns:
+            Whatever func returns
+        
+        Raises:
+            StorageConflictError: Still conflicting after all retries
+        """
+        if self._batch_depth > 0:
+            return func(*args, **kwargs)
+        
+        retries = self.commit_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                with self.batch():
+                    return func(*args, **kwargs)
+            except StorageConflictError:
+                if attempt == retries:
+                    raise
+                logging.getLogger("discord_bot").info(
+                    f"🔁 Concurrent write detected, retrying ({attempt + 1}/{retries})")
+    
+    @synchronized
+    def get_generation(self) -> int:
+        """
+        Generation of the cached data.
+        
+        Changes whenever the data changes (own commits and reloads after
+        another writer), so it can key caches of derived results.
+        """
+        self._load()
+        return self._generation
+    
+    @synchronized
+    def close(self):
+        """
+        Flush pending writes, drop the in-memory copy and release storage.
+        
+        The manager stays usable; the next call reopens storage and reloads.
+        """
+        self._flush_dirty()
+        self._users = self._matches = None
+        self._player_matches = {}
+        self._pair_stats = {}
+        self._match_order, self._match_keys = [], []
+        if self._storage is not None and self._owns_storage:
+            self._storage.close()
+            self._storage = None
     
     # ===== USER DATA METHODS =====
     
+    @synchronized
     def get_all_users(self) -> Dict[str, Any]:
-        """Get all users data."""
-        return self._load_json(self.users_file)
+        """Get all users data (shared cached copy - do not mutate)."""
+        self._load()
+        return self._users
     
+    @synchronized
     def get_user(self, name: str) -> Optional[Dict[str, Any]]:
         """Get specific user data by name."""
         users = self.get_all_users()
         return users.get(name)
     
+    @synchronized
     def user_exists(self, name: str) -> bool:
         """Check if user exists."""
         return name in self.get_all_users()
     
+    @synchronized
+    def get_user_names(self) -> List[str]:
+        """Get names of all users (a copy, safe to use from any thread)."""
+        return list(self.get_all_users())
+    
+    @transactional
     def add_user(self, name: str, tier: str, rank: str, main_position: str, 
                  sub_position: str, mmr: int = 1500) -> bool:
         """
@@ -97,9 +606,10 @@ class DataManager:
             "total_games": 0
         }
         
-        self._save_json(self.users_file, users)
+        self._commit(changed_users=[name])
         return True
     
+    @transactional
     def update_user(self, name: str, **kwargs) -> bool:
         """
         Update user data.
@@ -115,19 +625,26 @@ class DataManager:
             return False
         
         users = self.get_all_users()
+        old_mmr = users[name]["mmr"]
         users[name].update(kwargs)
-        self._save_json(self.users_file, users)
+        self._commit(changed_users=[name])
+        
+        # Ratings start from the tier MMR, so a correction changes the replay
+        if users[name]["mmr"] != old_mmr and self._player_matches.get(name):
+            self.recompute_ratings()
         return True
     
+    @transactional
     def delete_user(self, name: str) -> bool:
         """Delete a user."""
         users = self.get_all_users()
         if name in users:
             del users[name]
-            self._save_json(self.users_file, users)
+            self._commit(changed_users=[name])
             return True
         return False
     
+    @transactional
     def update_user_stats(self, name: str, won: bool):
         """Update user's win/loss statistics."""
         if not self.user_exists(name):
@@ -143,9 +660,15 @@ class DataManager:
         
         user["total_games"] += 1
         
-        self._save_json(self.users_file, users)
+        self._commit(changed_users=[name])
         return True
     
+    @synchronized
+    def get_rating(self, name: str) -> Tuple[float, float]:
+        """Current (rating, uncertainty) of a player, without scanning match history."""
+        return rating_engine.get_rating(self.get_user(name))
+    
+    @synchronized
     def get_user_winrate(self, name: str) -> Optional[float]:
         """Get user's win rate percentage."""
         user = self.get_user(name)
@@ -156,19 +679,23 @@ class DataManager:
     
     # ===== MATCH DATA METHODS =====
     
+    @synchronized
     def get_all_matches(self) -> Dict[str, Any]:
-        """Get all matches data."""
-        return self._load_json(self.matches_file)
+        """Get all matches data (shared cached copy - do not mutate)."""
+        self._load()
+        return self._matches
     
+    @synchronized
     def get_match(self, match_id: str) -> Optional[Dict[str, Any]]:
         """Get specific match data by ID."""
         matches = self.get_all_matches()
         return matches.get(match_id)
     
+    @transactional
     def add_match(self, blue_team: List[str], red_team: List[str], 
                   winner: str, mvp: str, date: str = None) -> str:
         """
-        Add a new match.
+        Add a new match and update every player's statistics in one write.
         
         Args:
             blue_team: List of blue team player names
@@ -184,6 +711,8 @@ class DataManager:
             date = datetime.now().strftime("%Y-%m-%d")
         
         matches = self.get_all_matches()
+        # Players with history but no stored rating predate the rating engine
+        backfill = self._ratings_missing()
         
         # Generate match ID
         match_count = len(matches) + 1
@@ -201,10 +730,10 @@ class DataManager:
             "winner": winner,
             "mvp": mvp
         }
+        self._index_match(match_id)
+        self._commit(changed_matches=[match_id])
         
-        self._save_json(self.matches_file, matches)
-        
-        # Update user statistics
+        # Update user statistics (committed together with the match)
         winning_team = blue_team if winner == "blue" else red_team
         losing_team = red_team if winner == "blue" else blue_team
         
@@ -214,39 +743,201 @@ class DataManager:
         for player in losing_team:
             self.update_user_stats(player, False)
         
+        # Ratings: O(team size) for the newest match, a replay if back-dated
+        # or if older history was never rated
+        if self._match_order[-1] == match_id and not backfill:
+            self._apply_match_rating(match_id)
+        else:
+            self.recompute_ratings()
+        
         return match_id
     
-    def get_user_matches(self, name: str) -> List[Dict[str, Any]]:
-        """Get all matches where user participated."""
+    @transactional
+    def delete_match(self, match_id: str) -> bool:
+        """
+        Delete a match and revert its players' win/loss statistics.
+        
+        Returns:
+            bool: True if deleted, False if the match doesn't exist
+        """
         matches = self.get_all_matches()
-        user_matches = []
+        match = matches.get(match_id)
+        if match is None:
+            return False
         
-        for match_id, match_data in matches.items():
-            if name in match_data["blue_team"] or name in match_data["red_team"]:
-                match_info = match_data.copy()
-                match_info["match_id"] = match_id
-                user_matches.append(match_info)
+        self._unindex_match(match_id)
+        del matches[match_id]
+        self._commit(changed_matches=[match_id])
         
-        return user_matches
+        winning_team = match["blue_team"] if match["winner"] == "blue" else match["red_team"]
+        for player in match["blue_team"] + match["red_team"]:
+            user = self._users.get(player)
+            if not user:
+                continue
+            user["wins" if player in winning_team else "losses"] -= 1
+            user["total_games"] -= 1
+            self._commit(changed_users=[player])
+        
+        # A rating update can't be undone on its own; replay the history
+        self.recompute_ratings()
+        return True
     
-    def get_recent_matches(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent matches."""
-        matches = self.get_all_matches()
+    def _ratings_missing(self) -> bool:
+        """Whether any registered player with recorded matches lacks a stored rating."""
+        return any("rating" not in user for name, user in self._users.items()
+                   if self._player_matches.get(name))
+    
+    def _apply_match_rating(self, match_id: str):
+        """Update the stored ratings of one match's registered players."""
+        match = self._matches[match_id]
+        ratings = {player: rating_engine.get_rating(self._users.get(player))
+                   for player in match["blue_team"] + match["red_team"]}
+        updated = rating_engine.rate_match(match["blue_team"], match["red_team"], match["winner"], ratings)
+        for player, (mu, sigma) in updated.items():
+            user = self._users.get(player)
+            if user:
+                user["rating"], user["rating_sigma"] = mu, sigma
+                self._commit(changed_users=[player])
+    
+    @transactional
+    def recompute_ratings(self) -> int:
+        """
+        Rebuild every stored rating by replaying the whole match history.
+        
+        Used after deleting or back-dating a match, and to fill in ratings
+        for data recorded before the rating engine existed.
+        
+        Returns:
+            int: Number of users whose stored rating changed
+        """
+        users = self.get_all_users()
+        ratings = rating_engine.replay((self._matches[match_id] for match_id in self._match_order), users)
         
-        # Sort by match_id (which includes chronological order)
-        sorted_matches = sorted(matches.items(), reverse=True)
+        changed = 0
+        for name, user in users.items():
+            if name in ratings:
+                mu, sigma = ratings[name]
+                new = {"rating": mu, "rating_sigma": sigma}
+            else:
+                new = {}
+            old = {field: user[field] for field in ("rating", "rating_sigma") if field in user}
+            if old != new:
+                user.pop("rating", None)
+                user.pop("rating_sigma", None)
+                user.update(new)
+                self._commit(changed_users=[name])
+                changed += 1
+        return changed
+    
+    @synchronized
+    def get_user_match_ids(self, name: str) -> List[str]:
+        """Get IDs of all matches the user played, in chronological order."""
+        self._load()
+        return list(self._player_matches.get(name, ()))
+    
+    @synchronized
+    def get_pair_stats(self, players: Iterable[str]) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """
+        Games and wins of every pair of the given players as teammates.
+        
+        Read from an index updated on every added/deleted match, so this
+        costs one lookup per pair regardless of history length.
+        
+        Returns:
+            Dict: (name, name) sorted pair -> (games together, wins together),
+            only pairs that have played together
+        """
+        self._load()
+        stats = {}
+        for pair in combinations(sorted(set(players)), 2):
+            entry = self._pair_stats.get(pair)
+            if entry:
+                stats[pair] = tuple(entry)
+        return stats
+    
+    @synchronized
+    def get_user_matches(self, name: str, start: Union[str, Date] = None,
+                         end: Union[str, Date] = None) -> List[MatchView]:
+        """
+        Get matches where user participated, in chronological order.
+        
+        Args:
+            name: Player name
+            start: First date to include ("YYYY-MM-DD" or date, default: no limit)
+            end: Last date to include ("YYYY-MM-DD" or date, default: no limit)
+        """
+        self._load()
+        matches = self._matches
+        match_ids = self._player_matches.get(name, [])
+        if start is not None or end is not None:
+            low, high = self._date_bounds(start, end)
+            first = bisect.bisect_left(match_ids, low, key=self._chronological_key)
+            last = bisect.bisect_right(match_ids, high, lo=first, key=self._chronological_key)
+            match_ids = match_ids[first:last]
+        return [MatchView(match_id, matches[match_id]) for match_id in match_ids]
+    
+    @synchronized
+    def get_matches_between(self, start: Union[str, Date] = None,
+                            end: Union[str, Date] = None) -> List[MatchView]:
+        """
+        Get matches played between two dates (inclusive), oldest first.
         
-        recent = []
-        for match_id, match_data in sorted_matches[:limit]:
-            match_info = match_data.copy()
-            match_info["match_id"] = match_id
-            recent.append(match_info)
+        Args:
+            start: First date to include ("YYYY-MM-DD" or date, default: no limit)
+            end: Last date to include ("YYYY-MM-DD" or date, default: no limit)
+        """
+        self._load()
+        low, high = self._date_bounds(start, end)
+        first = bisect.bisect_left(self._match_keys, low)
+        last = bisect.bisect_right(self._match_keys, high, lo=first)
+        matches = self._matches
+        return [MatchView(match_id, matches[match_id]) for match_id in self._match_order[first:last]]
+    
+    @synchronized
+    def get_matches_page(self, cursor: str = None, limit: int = 10,
+                         newest_first: bool = True) -> Tuple[List[MatchView], Optional[str]]:
+        """
+        Page through the match history.
+        
+        The cursor is tied to a match position rather than an offset, so
+        pages stay consistent while matches are added or deleted.
+        
+        Args:
+            cursor: Cursor returned by the previous page (None for the first page)
+            limit: Maximum matches per page
+            newest_first: Page from the latest match backwards
         
-        return recent
+        Returns:
+            Tuple: (matches, cursor for the next page or None at the end)
+        """
+        self._load()
+        keys = self._match_keys
+        if newest_first:
+            end = bisect.bisect_left(keys, self._decode_cursor(cursor)) if cursor else len(keys)
+            start = max(0, end - limit)
+            page = self._match_order[start:end][::-1]
+            has_more = start > 0
+        else:
+            start = bisect.bisect_right(keys, self._decode_cursor(cursor)) if cursor else 0
+            end = min(len(keys), start + limit)
+            page = self._match_order[start:end]
+            has_more = end < len(keys)
+        
+        next_cursor = None
+        if page and has_more:
+            next_cursor = self._encode_cursor(self._chronological_key(page[-1]))
+        matches = self._matches
+        return [MatchView(match_id, matches[match_id]) for match_id in page], next_cursor
+    
+    @synchronized
+    def get_recent_matches(self, limit: int = 10) -> List[MatchView]:
+        """Get recent matches, newest first."""
+        return self.get_matches_page(limit=limit)[0]
     
     # ===== UTILITY METHODS =====
     
-    def get_leaderboard(self, sort_by: str = "mmr") -> List[Dict[str, Any]]:
+    @synchronized
+    def get_leaderboard(self, sort_by: str = "mmr") -> List[UserView]:
         """
         Get leaderboard sorted by specified field.
         
@@ -254,44 +945,333 @@ class DataManager:
             sort_by: Field to sort by (mmr, wins, winrate, total_games)
         
         Returns:
-            List of users sorted by specified field
+            List of read-only user views sorted by specified field
         """
         users = self.get_all_users()
+        leaderboard = [UserView(name, data) for name, data in users.items()]
         
-        leaderboard = []
-        for name, data in users.items():
-            user_data = data.copy()
-            user_data["name"] = name
-            
-            # Calculate win rate for sorting
-            if sort_by == "winrate":
-                if user_data["total_games"] > 0:
-                    user_data["winrate"] = (user_data["wins"] / user_data["total_games"]) * 100
-                else:
-                    user_data["winrate"] = 0
-        
-            leaderboard.append(user_data)
-        
-        # Sort by specified field
-        if sort_by in ["mmr", "wins", "total_games", "winrate"]:
+        # Sort by specified field (win rate is computed by the view)
+        if sort_by == "winrate":
+            leaderboard.sort(key=lambda x: x.winrate, reverse=True)
+        elif sort_by in ["mmr", "wins", "total_games"]:
             leaderboard.sort(key=lambda x: x.get(sort_by, 0), reverse=True)
         
         return leaderboard
     
+    @synchronized
     def get_match_count(self) -> int:
         """Get total number of matches."""
         return len(self.get_all_matches())
     
+    @synchronized
     def get_user_count(self) -> int:
         """Get total number of users."""
         return len(self.get_all_users())
 
 
-# Global instance
-data_manager = DataManager()
+class AsyncDataManager:
+    """
+    Awaitable facade over DataManager for use inside slash command handlers.
+    
+    Every call runs on a dedicated single-thread executor so file/DB work
+    never blocks the gateway event loop. Writers are additionally serialised
+    with an asyncio lock, so a multi-step write (see transaction()) is not
+    interleaved with other writes.
+    """
+    
+    def __init__(self, dm: DataManager, executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Wrap a DataManager.
+        
+        Args:
+            dm: Synchronous data manager doing the actual work
+            executor: Executor for data work (defaults to a dedicated thread,
+                      started on first use and stopped by close())
+        """
+        self.dm = dm
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._write_lock = asyncio.Lock()
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the data executor, starting its thread if needed."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="data_manager"
+            )
+        return self._executor
+    
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run any blocking function on the data executor and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(func, *args, **kwargs)
+        )
+    
+    async def _write(self, func: Callable, *args, **kwargs):
+        """Run a mutating call on the data executor, one writer at a time."""
+        async with self._write_lock:
+            return await self.run(func, *args, **kwargs)
+    
+    async def transaction(self, func: Callable, *args, **kwargs):
+        """
+        Run func(dm, *args, **kwargs) through DataManager.mutate().
+        
+        All changes made by func are committed as one write; func is re-run
+        on fresh data if another writer committed first.
+        """
+        return await self._write(self.dm.mutate, func, self.dm, *args, **kwargs)
+    
+    async def get_generation(self) -> int:
+        """Generation of the cached data (see DataManager.get_generation)."""
+        return await self.run(self.dm.get_generation)
+    
+    async def flush(self):
+        """Force all write-behind changes to storage now."""
+        await self._write(self.dm.flush)
+    
+    async def close(self):
+        """
+        Flush and unload the data manager, then stop the executor thread.
+        
+        Both are restarted transparently if the facade is used again.
+        """
+        async with self._write_lock:
+            await self.run(self.dm.close)
+            if self._owns_executor and self._executor is not None:
+                executor, self._executor = self._executor, None
+                executor.shutdown(wait=False)
+    
+    # ===== USER DATA METHODS =====
+    
+    async def get_user(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get specific user data by name."""
+        return await self.run(self.dm.get_user, name)
+    
+    async def user_exists(self, name: str) -> bool:
+        """Check if user exists."""
+        return await self.run(self.dm.user_exists, name)
+    
+    async def get_user_names(self) -> List[str]:
+        """Get names of all users."""
+        return await self.run(self.dm.get_user_names)
+    
+    async def add_user(self, *args, **kwargs) -> bool:
+        """Add a new user (see DataManager.add_user)."""
+        return await self._write(self.dm.add_user, *args, **kwargs)
+    
+    async def update_user(self, name: str, **kwargs) -> bool:
+        """Update user data."""
+        return await self._write(self.dm.update_user, name, **kwargs)
+    
+    async def delete_user(self, name: str) -> bool:
+        """Delete a user."""
+        return await self._write(self.dm.delete_user, name)
+    
+    async def get_user_winrate(self, name: str) -> Optional[float]:
+        """Get user's win rate percentage."""
+        return await self.run(self.dm.get_user_winrate, name)
+    
+    async def get_rating(self, name: str) -> Tuple[float, float]:
+        """Current (rating, uncertainty) of a player."""
+        return await self.run(self.dm.get_rating, name)
+    
+    async def recompute_ratings(self) -> int:
+        """Rebuild every stored rating from the match history."""
+        return await self._write(self.dm.recompute_ratings)
+    
+    # ===== MATCH DATA METHODS =====
+    
+    async def get_match(self, match_id: str) -> Optional[Dict[str, Any]]:
+        """Get specific match data by ID."""
+        return await self.run(self.dm.get_match, match_id)
+    
+    async def add_match(self, *args, **kwargs) -> str:
+        """Add a new match (see DataManager.add_match)."""
+        return await self._write(self.dm.add_match, *args, **kwargs)
+    
+    async def delete_match(self, match_id: str) -> bool:
+        """Delete a match and revert its players' statistics."""
+        return await self._write(self.dm.delete_match, match_id)
+    
+    async def get_user_matches(self, name: str, start: Union[str, Date] = None,
+                               end: Union[str, Date] = None) -> List[MatchView]:
+        """Get matches where user participated (optionally within a date range)."""
+        return await self.run(self.dm.get_user_matches, name, start, end)
+    
+    async def get_pair_stats(self, players: Iterable[str]) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """Games and wins together of every pair of the given players."""
+        return await self.run(self.dm.get_pair_stats, list(players))
+    
+    async def get_matches_between(self, start: Union[str, Date] = None,
+                                  end: Union[str, Date] = None) -> List[MatchView]:
+        """Get matches played between two dates (inclusive)."""
+        return await self.run(self.dm.get_matches_between, start, end)
+    
+    async def get_matches_page(self, cursor: str = None, limit: int = 10,
+                               newest_first: bool = True) -> Tuple[List[MatchView], Optional[str]]:
+        """Page through the match history (see DataManager.get_matches_page)."""
+        return await self.run(self.dm.get_matches_page, cursor, limit, newest_first)
+    
+    async def get_recent_matches(self, limit: int = 10) -> List[MatchView]:
+        """Get recent matches, newest first."""
+        return await self.run(self.dm.get_recent_matches, limit)
+    
+    # ===== UTILITY METHODS =====
+    
+    async def get_leaderboard(self, sort_by: str = "mmr") -> List[UserView]:
+        """Get leaderboard sorted by specified field."""
+        return await self.run(self.dm.get_leaderboard, sort_by)
+    
+    async def get_match_count(self) -> int:
+        """Get total number of matches."""
+        return await self.run(self.dm.get_match_count)
+    
+    async def get_user_count(self) -> int:
+        """Get total number of users."""
+        return await self.run(self.dm.get_user_count)
+
+
+class GuildDataStores:
+    """
+    Per-guild data stores, loaded lazily and unloaded when inactive.
+    
+    Each guild gets its own data directory (data/guilds/<guild_id>/) with its
+    own DataManager and AsyncDataManager. The facade objects live for the
+    whole process so a handler never holds a stale one; what is evicted is
+    their loaded state (cached data, open storage, executor thread). At most
+    `max_loaded` guilds stay loaded (least recently used are unloaded first)
+    and a guild idle for `idle_timeout` seconds is unloaded as well, checked
+    on every get() and by a sweep on the event loop while any guild is loaded.
+    """
+    
+    def __init__(self, base_dir: Path = Path("data"), sharding: bool = False,
+                 legacy_guild_id: Optional[int] = None, max_loaded: int = 20,
+                 idle_timeout: float = 1800):
+        """
+        Initialize the store registry.
+        
+        Args:
+            base_dir: Root data directory
+            sharding: Give every guild its own directory (False = all guilds share base_dir)
+            legacy_guild_id: Guild that keeps using base_dir itself (pre-sharding data)
+            max_loaded: Maximum number of guild stores kept loaded
+            idle_timeout: Seconds without use before a store is unloaded
+        """
+        self.base_dir = Path(base_dir)
+        self.sharding = sharding
+        self.legacy_guild_id = legacy_guild_id
+        self.max_loaded = max_loaded
+        self.idle_timeout = idle_timeout
+        
+        self._stores: Dict[Optional[int], AsyncDataManager] = {}
+        # Store key -> last use (monotonic), least recently used first
+        self._loaded: "OrderedDict[Optional[int], float]" = OrderedDict()
+        self._sweep_handle: Optional[asyncio.TimerHandle] = None
+    
+    def _store_key(self, guild_id: Optional[int]) -> Optional[int]:
+        """Map a guild to its store (None = the shared base directory)."""
+        if not self.sharding or guild_id is None or guild_id == self.legacy_guild_id:
+            return None
+        return guild_id
+    
+    def _data_dir(self, key: Optional[int]) -> Path:
+        """Data directory for a store key."""
+        if key is None:
+            return self.base_dir
+        return self.base_dir / "guilds" / str(key)
+    
+    def get(self, guild_id: Optional[int] = None) -> AsyncDataManager:
+        """Get the async data manager for a guild, marking it as recently used."""
+        key = self._store_key(guild_id)
+        store = self._stores.get(key)
+        if store is None:
+            store = AsyncDataManager(DataManager(self._data_dir(key)))
+            self._stores[key] = store
+        
+        self._loaded[key] = time.monotonic()
+        self._loaded.move_to_end(key)
+        self._evict_inactive()
+        self._schedule_sweep()
+        return store
+    
+    def _schedule_sweep(self):
+        """Check for idle stores again later (needs a running loop; one pending sweep at a time)."""
+        if self._sweep_handle is not None or not self._loaded:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop: idle stores are unloaded on the next get()
+        self._sweep_handle = loop.call_later(self.idle_timeout / 2, self._sweep)
+    
+    def _sweep(self):
+        """Unload idle stores even when no command is using the data."""
+        self._sweep_handle = None
+        self._evict_inactive()
+        self._schedule_sweep()
+    
+    def _evict_inactive(self):
+        """Unload least recently used and idle stores."""
+        now = time.monotonic()
+        while self._loaded:
+            key, last_used = next(iter(self._loaded.items()))
+            if len(self._loaded) <= self.max_loaded and now - last_used < self.idle_timeout:
+                break
+            del self._loaded[key]
+            self._unload(self._stores[key])
+    
+    def _unload(self, store: AsyncDataManager):
+        """Unload a store in the background (or synchronously without a loop)."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            store.dm.close()
+            return
+        task = loop.create_task(store.close())
+        task.add_done_callback(functools.partial(self._log_unload_error, store))
+    
+    @staticmethod
+    def _log_unload_error(store: AsyncDataManager, task: asyncio.Task):
+        """Report a background unload that failed (its changes stay pending)."""
+        if not task.cancelled() and task.exception() is not None:
+            logging.getLogger("discord_bot").error(
+                f"❌ Failed to unload data store {store.dm.data_dir}: {task.exception()}")
+    
+    async def flush_all(self):
+        """
+        Flush pending writes of every loaded store, and of any unloaded one
+        whose flush failed. One store failing doesn't stop the others.
+        """
+        for key, store in list(self._stores.items()):
+            if key not in self._loaded and not store.dm.has_unflushed_changes():
+                continue
+            try:
+                await store.flush()
+            except Exception as e:
+                logging.getLogger("discord_bot").error(
+                    f"❌ Failed to flush data store {store.dm.data_dir}: {e}")
+    
+    def loaded_guilds(self) -> List[Optional[int]]:
+        """Store keys currently loaded, least recently used first."""
+        return list(self._loaded)
+
+
+# Global registry of per-guild stores
+guild_stores = GuildDataStores(
+    sharding=settings.GUILD_DATA_SHARDING,
+    legacy_guild_id=settings.LEGACY_GUILD_ID,
+    max_loaded=settings.MAX_LOADED_GUILDS,
+    idle_timeout=settings.GUILD_IDLE_TIMEOUT
+)
 
 
 # Helper functions for easy import
-def get_data_manager() -> DataManager:
-    """Get the global data manager instance."""
-    return data_manager
\ No newline at end of file
+def get_data_manager(guild_id: Optional[int] = None) -> DataManager:
+    """Get the data manager for a guild (None = shared default store)."""
+    return guild_stores.get(guild_id).dm
+
+
+def get_async_data_manager(guild_id: Optional[int] = None) -> AsyncDataManager:
+    """Get the async data manager for a guild (None = shared default store)."""
+    return guild_stores.get(guild_id)
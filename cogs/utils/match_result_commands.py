@@ -7,7 +7,7 @@ Now supports automatic detection of recent team formation results.
 
 File: cogs/utils/match_result_commands.py
 Author: Juan Dodam
-Version: 2.1.0
+Version: 2.2.0 - Collect every option of the latest team formation
 """
 
 import discord
@@ -15,13 +15,16 @@ from discord import app_commands
 import traceback
 import re
 from typing import Literal, List, Optional, Tuple
-from cogs.utils.data_manager import get_data_manager
+from cogs.utils.data_manager import get_async_data_manager
 
 
-async def get_recent_team_formations(channel, limit: int = 3) -> List[Tuple[List[str], List[str], str, str]]:
+async def get_recent_team_formations(channel, limit: int = 10) -> List[Tuple[List[str], List[str], str, str]]:
     """
     채널에서 최근 팀구성 결과들을 찾습니다.
     
+    가장 최근 `/팀구성` 결과의 모든 옵션을 모으고, 그 결과의
+    헤더 메시지(다중 옵션 팀 구성 결과)에 도달하면 중단합니다.
+    
     Returns:
         List[Tuple[blue_team, red_team, formation_type, message_id]]
     """
@@ -30,6 +33,10 @@ async def get_recent_team_formations(channel, limit: int = 3) -> List[Tuple[List
         async for message in channel.history(limit=200):  # 더 많은 메시지 검색
             if message.author.bot and len(message.embeds) > 0:
                 for embed in message.embeds:
+                    # 최근 팀구성의 헤더까지 왔으면 그 결과의 옵션을 모두 찾은 것
+                    if embed.title and "다중 옵션 팀 구성 결과" in embed.title and formations:
+                        return formations
+                    
                     # 팀구성 명령어 결과인지 확인
                     if embed.title and ("팀 구성 결과" in embed.title or "옵션" in embed.title):
                         teams = parse_team_from_embed(embed)
@@ -101,8 +108,14 @@ def determine_formation_type(title: str) -> str:
     """
     임베드 제목에서 팀구성 방식을 결정합니다.
     """
-    if "포지션+MMR" in title or ("포지션" in title and "MMR" in title):
+    if "포지션 만족 우선" in title:
+        return "포지션 + MMR 밸런싱 (포지션 만족 우선)"
+    elif "공정 우선" in title:
+        return "포지션 + MMR 밸런싱 (공정 우선)"
+    elif "포지션+MMR" in title or ("포지션" in title and "MMR" in title):
         return "포지션 + MMR 밸런싱"
+    elif "시너지" in title or "승률 예측" in title:
+        return "시너지 포함 승률 예측"
     elif "MMR만" in title or ("MMR" in title and "포지션" not in title):
         return "MMR 밸런싱만"
     elif "대안" in title or "다양성" in title:
@@ -135,10 +148,10 @@ class TeamSelectionView(discord.ui.View):
         try:
             blue_team, red_team, formation_type, message_id = self.formations[selected_index]
             
-            dm = get_data_manager()
+            adm = get_async_data_manager(interaction.guild_id)
             
             # Save match (MVP 없이)
-            match_id = dm.add_match(
+            match_id = await adm.add_match(
                 blue_team=blue_team,
                 red_team=red_team,
                 winner=self.winner,
@@ -261,7 +274,7 @@ async def match_result_command(
         await interaction.response.defer()
         
         # 채널에서 최근 팀구성 결과들 찾기
-        formations = await get_recent_team_formations(interaction.channel, limit=3)
+        formations = await get_recent_team_formations(interaction.channel)
         
         if not formations:
             embed = discord.Embed(
@@ -13,7 +13,7 @@ import discord
 from discord import app_commands
 from typing import Literal
 import traceback
-from cogs.utils.data_manager import get_data_manager
+from cogs.utils.data_manager import get_async_data_manager
 
 
 # MMR calculation based on tier and rank
@@ -74,11 +74,11 @@ async def modify_command(
     try:
         # Get data manager
         logger.debug("Getting data manager instance")
-        dm = get_data_manager()
+        adm = get_async_data_manager(interaction.guild_id)
         
         # Check if user exists
         logger.debug(f"Checking if user {실명} exists")
-        if not dm.user_exists(실명):
+        if not await adm.user_exists(실명):
             logger.warning(f"User not found for modification: {실명} by {interaction.user}")
             await interaction.response.send_message(
                 f"❌ '{실명}' 이름으로 등록된 유저를 찾을 수 없습니다.", 
@@ -87,7 +87,7 @@ async def modify_command(
             return
         
         # Get existing user data
-        existing_user = dm.get_user(실명)
+        existing_user = await adm.get_user(실명)
         logger.debug(f"Existing user data: {existing_user}")
         
         # Check if any parameters were provided
@@ -141,7 +141,7 @@ async def modify_command(
         
         # Update user data
         logger.debug(f"Updating user {실명} with data: {update_data}")
-        success = dm.update_user(실명, **update_data)
+        success = await adm.update_user(실명, **update_data)
         
         if success:
             logger.info(f"✅ User {실명} modified successfully")
@@ -160,7 +160,7 @@ async def modify_command(
             )
             
             # Show updated info
-            updated_user = dm.get_user(실명)
+            updated_user = await adm.get_user(실명)
             embed.add_field(
                 name="📋 수정된 정보",
                 value=f"티어: {updated_user['tier']} {updated_user['rank']}\nMMR: {updated_user['mmr']}\n주포지션: {updated_user['main_position']}\n부포지션: {updated_user['sub_position']}",
@@ -174,7 +174,7 @@ async def modify_command(
             logger.info(f"✅ Modification confirmation sent for {실명}")
             
         else:
-            logger.error(f"❌ Failed to update user {실명} - dm.update_user returned False")
+            logger.error(f"❌ Failed to update user {실명} - adm.update_user returned False")
             await interaction.response.send_message(
                 "❌ 정보 수정 중 오류가 발생했습니다.", 
                 ephemeral=True
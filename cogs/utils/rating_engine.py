@@ -0,0 +1,146 @@
+"""
+Incremental Team Rating Engine
+==============================
+
+TrueSkill-style rating for 5v5 internal matches. Every player has a skill
+estimate (mu, on the MMR scale) and an uncertainty (sigma). Recording a
+match moves each player's mu toward the result by an amount that grows
+with their own uncertainty and with how surprising the result was, then
+shrinks their sigma, touching only the ten players of that match.
+
+DataManager stores the result in the user record ("rating", "rating_sigma")
+so balancers read a current rating without scanning match history. Players
+without a stored rating start at their tier MMR with params.initial_sigma.
+
+File: cogs/utils/rating_engine.py
+Author: Juan Dodam
+Version: 1.0.0
+"""
+
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple, Iterable
+import settings
+
+DEFAULT_MU = 1000  # Unregistered players, same default as the balancers
+
+Rating = Tuple[float, float]  # (mu, sigma)
+
+
+class RatingParams(NamedTuple):
+    """Rating model parameters (see settings.RATING_*)."""
+    beta: float           # Performance spread of a single player in one game
+    tau: float            # Uncertainty added before every game (skill drift)
+    initial_sigma: float  # Uncertainty of a player's first rating
+
+
+def default_params() -> RatingParams:
+    """Parameters configured in settings."""
+    return RatingParams(settings.RATING_BETA, settings.RATING_TAU, settings.RATING_INITIAL_SIGMA)
+
+
+def _normal_cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+def _normal_pdf(x: float) -> float:
+    return math.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+
+def _truncation_factors(t: float) -> Tuple[float, float]:
+    """TrueSkill's v(t) and w(t) for a win with performance margin t."""
+    cdf = _normal_cdf(t)
+    if cdf < 1e-300:
+        return -t, 1.0  # Limit for a hopelessly unexpected win
+    v = _normal_pdf(t) / cdf
+    return v, v * (v + t)
+
+
+def get_rating(user: Optional[Dict], params: RatingParams = None) -> Rating:
+    """(mu, sigma) stored in a user record, or the starting rating."""
+    params = params or default_params()
+    if not user:
+        return float(DEFAULT_MU), params.initial_sigma
+    if "rating" in user:
+        return user["rating"], user["rating_sigma"]
+    return float(user["mmr"]), params.initial_sigma
+
+
+def _team_spread(blue: List[Rating], red: List[Rating], params: RatingParams) -> float:
+    """Standard deviation of the team performance difference."""
+    variance = sum(sigma ** 2 for _, sigma in blue + red)
+    return math.sqrt(variance + len(blue + red) * params.beta ** 2)
+
+
+def win_probability(blue: List[Rating], red: List[Rating], params: RatingParams = None) -> float:
+    """Probability that the blue team beats the red team."""
+    params = params or default_params()
+    margin = sum(mu for mu, _ in blue) - sum(mu for mu, _ in red)
+    return _normal_cdf(margin / _team_spread(blue, red, params))
+
+
+def rate_match(blue_team: List[str], red_team: List[str], winner: str,
+               ratings: Dict[str, Rating], params: RatingParams = None) -> Dict[str, Rating]:
+    """
+    New ratings of the match's players after one result.
+    
+    Args:
+        blue_team: Blue team player names
+        red_team: Red team player names
+        winner: "blue" or "red" (anything else leaves ratings unchanged)
+        ratings: Current (mu, sigma) of at least every player in the match
+        params: Model parameters (default: settings)
+    
+    Returns:
+        Dict: player -> (mu, sigma) for the match's players only
+    """
+    params = params or default_params()
+    if winner not in ("blue", "red"):
+        return {player: ratings[player] for player in blue_team + red_team}
+    
+    winners, losers = (blue_team, red_team) if winner == "blue" else (red_team, blue_team)
+    
+    # Skill may have drifted since each player's last game
+    prior = {player: (ratings[player][0], math.sqrt(ratings[player][1] ** 2 + params.tau ** 2))
+             for player in winners + losers}
+    
+    spread = _team_spread([prior[p] for p in winners], [prior[p] for p in losers], params)
+    margin = sum(prior[p][0] for p in winners) - sum(prior[p][0] for p in losers)
+    v, w = _truncation_factors(margin / spread)
+    
+    updated = {}
+    for team, sign in ((winners, 1), (losers, -1)):
+        for player in team:
+            mu, sigma = prior[player]
+            variance = sigma ** 2
+            mu += sign * variance / spread * v
+            variance *= max(1 - variance / spread ** 2 * w, 1e-4)
+            updated[player] = (mu, math.sqrt(variance))
+    return updated
+
+
+def replay(matches: Iterable[Dict], users: Dict[str, Dict],
+           params: RatingParams = None) -> Dict[str, Rating]:
+    """
+    Ratings after replaying matches from scratch, in the given order.
+    
+    Every registered player starts from their tier MMR, ignoring any stored
+    rating; unregistered names start from DEFAULT_MU.
+    
+    Args:
+        matches: Match records in chronological order
+        users: User records (for starting MMRs)
+        params: Model parameters (default: settings)
+    
+    Returns:
+        Dict: player -> (mu, sigma) for every player who played
+    """
+    params = params or default_params()
+    ratings: Dict[str, Rating] = {}
+    for match in matches:
+        players = match["blue_team"] + match["red_team"]
+        for player in players:
+            if player not in ratings:
+                user = users.get(player)
+                ratings[player] = (float(user["mmr"]) if user else float(DEFAULT_MU), params.initial_sigma)
+        ratings.update(rate_match(match["blue_team"], match["red_team"], match.get("winner"), ratings, params))
+    return ratings
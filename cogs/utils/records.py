@@ -0,0 +1,95 @@
+"""
+Read-only Record Views
+======================
+
+Lightweight views returned by DataManager list queries (leaderboard, recent
+matches, user matches). A view wraps the cached record dictionary without
+copying it and adds the key it is stored under as a stable attribute
+(`name` / `match_id`), so listing every user or match no longer allocates
+a fresh dict per record.
+
+Views support the read side of a dict (view["mmr"], view.get("mvp"), `in`,
+iteration) plus attribute access, and cannot be modified. They reflect the
+cached record, so call dict(view) when a detached copy is needed.
+
+File: cogs/utils/records.py
+Author: Juan Dodam
+Version: 1.0.0
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Any
+
+
+class _RecordView(Mapping):
+    """Immutable mapping view over one cached record plus its key."""
+    
+    __slots__ = ("_data",)
+    _key_field = ""
+    
+    def __getitem__(self, field: str):
+        if field == self._key_field:
+            return getattr(self, field)
+        return self._data[field]
+    
+    def __iter__(self):
+        yield self._key_field
+        yield from self._data
+    
+    def __len__(self) -> int:
+        return len(self._data) + 1
+    
+    def __getattr__(self, field: str):
+        # Only called for names that are not slots/properties
+        if field.startswith("_"):
+            raise AttributeError(field)
+        try:
+            return self._data[field]
+        except KeyError:
+            raise AttributeError(field) from None
+    
+    def __setattr__(self, field: str, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+    
+    def __delattr__(self, field: str):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+    
+    def __reduce__(self):
+        # copy/pickle through __init__ since attributes cannot be set
+        return (type(self), (getattr(self, self._key_field), self._data))
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({getattr(self, self._key_field)!r})"
+
+
+class UserView(_RecordView):
+    """Read-only view of a user record with its `name`."""
+    
+    __slots__ = ("name",)
+    _key_field = "name"
+    
+    def __init__(self, name: str, data: Dict[str, Any]):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "_data", data)
+    
+    def __getitem__(self, field: str):
+        if field == "winrate" and field not in self._data:
+            return self.winrate
+        return super().__getitem__(field)
+    
+    @property
+    def winrate(self) -> float:
+        """Win rate in percent (0 without games)."""
+        total_games = self._data.get("total_games", 0)
+        return (self._data.get("wins", 0) / total_games) * 100 if total_games > 0 else 0
+
+
+class MatchView(_RecordView):
+    """Read-only view of a match record with its `match_id`."""
+    
+    __slots__ = ("match_id",)
+    _key_field = "match_id"
+    
+    def __init__(self, match_id: str, data: Dict[str, Any]):
+        object.__setattr__(self, "match_id", match_id)
+        object.__setattr__(self, "_data", data)
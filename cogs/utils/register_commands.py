@@ -13,7 +13,7 @@ import discord
 from discord import app_commands
 from typing import Literal
 import traceback
-from cogs.utils.data_manager import get_data_manager
+from cogs.utils.data_manager import get_async_data_manager
 
 
 # MMR calculation based on tier and rank
@@ -74,7 +74,7 @@ async def register_command(
     try:
         # Get data manager
         logger.debug("Getting data manager instance")
-        dm = get_data_manager()
+        adm = get_async_data_manager(interaction.guild_id)
         
         # Validate tier and rank combination
         logger.debug(f"Validating tier {티어} and rank {랭크} combination")
@@ -88,7 +88,7 @@ async def register_command(
         
         # Check if user already exists
         logger.debug(f"Checking if user {실명} already exists")
-        if dm.user_exists(실명):
+        if await adm.user_exists(실명):
             logger.warning(f"User {실명} already exists, requesting clarification from {interaction.user}")
             
             # Create embed asking for clarification
@@ -99,7 +99,7 @@ async def register_command(
             )
             
             # Get existing user data to show
-            existing_user = dm.get_user(실명)
+            existing_user = await adm.get_user(실명)
             embed.add_field(
                 name="기존 등록 정보",
                 value=f"티어: {existing_user['tier']} {existing_user['rank']}\n주포지션: {existing_user['main_position']}\n부포지션: {existing_user['sub_position']}",
@@ -122,7 +122,7 @@ async def register_command(
         
         # Add user to database
         logger.debug(f"Adding user {실명} to database with MMR {mmr}")
-        success = dm.add_user(
+        success = await adm.add_user(
             name=실명,
             tier=티어,
             rank=랭크,
@@ -179,7 +179,7 @@ async def register_command(
             logger.info(f"✅ Registration confirmation sent for {실명}")
             
         else:
-            logger.error(f"❌ Failed to add user {실명} to database - dm.add_user returned False")
+            logger.error(f"❌ Failed to add user {실명} to database - adm.add_user returned False")
             await interaction.response.send_message(
                 "❌ 등록 중 오류가 발생했습니다.", 
                 ephemeral=True
@@ -253,11 +253,11 @@ async def check_registration_command(
     try:
         # Get data manager
         logger.debug("Getting data manager instance")
-        dm = get_data_manager()
+        adm = get_async_data_manager(interaction.guild_id)
         
         # Get user data
         logger.debug(f"Retrieving user data for {실명}")
-        user_data = dm.get_user(실명)
+        user_data = await adm.get_user(실명)
         
         if not user_data:
             logger.warning(f"User not found: {실명} requested by {interaction.user}")
@@ -271,7 +271,7 @@ async def check_registration_command(
         
         # Calculate win rate
         logger.debug(f"Calculating win rate for {실명}")
-        winrate = dm.get_user_winrate(실명)
+        winrate = await adm.get_user_winrate(실명)
         winrate_text = f"{winrate:.1f}%" if winrate is not None else "0%"
         logger.debug(f"Win rate calculated: {winrate_text}")
         
@@ -14,7 +14,7 @@ from discord import app_commands
 import traceback
 from typing import Optional, Dict, List, Tuple
 from collections import defaultdict
-from cogs.utils.data_manager import get_data_manager
+from cogs.utils.data_manager import get_async_data_manager
 
 
 def calculate_teammate_stats(user_name: str, dm) -> Dict[str, Dict]:
@@ -25,9 +25,9 @@ def calculate_teammate_stats(user_name: str, dm) -> Dict[str, Dict]:
     user_matches = dm.get_user_matches(user_name)
     
     for match in user_matches:
-        blue_team = match.get('blue_team', [])
-        red_team = match.get('red_team', [])
-        winner = match.get('winner', '')
+        blue_team = match.blue_team
+        red_team = match.red_team
+        winner = match.winner
         
         # Determine if user was on blue or red team
         if user_name in blue_team:
@@ -109,11 +109,11 @@ def calculate_team_formation_reliability(dm) -> Tuple[float, int]:
 async def player_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     """Autocomplete function for player names."""
     try:
-        dm = get_data_manager()
-        all_users = dm.get_all_users()
+        adm = get_async_data_manager(interaction.guild_id)
+        user_names = await adm.get_user_names()
         
         # Filter users based on current input
-        filtered_users = [name for name in all_users.keys() if current.lower() in name.lower()]
+        filtered_users = [name for name in user_names if current.lower() in name.lower()]
         
         # Return up to 25 choices (Discord limit)
         return [
@@ -145,14 +145,14 @@ async def statistics_command(
     
     try:
         # Get data manager
-        dm = get_data_manager()
+        adm = get_async_data_manager(interaction.guild_id)
         
         if 유저:
             # Individual user statistics
-            await show_individual_stats(interaction, 유저, dm, logger)
+            await show_individual_stats(interaction, 유저, adm, logger)
         else:
             # Server-wide statistics
-            await show_server_stats(interaction, dm, logger)
+            await show_server_stats(interaction, adm, logger)
             
     except discord.HTTPException as e:
         logger.error(f"❌ Discord HTTP error in statistics command: {e}")
@@ -181,12 +181,12 @@ async def statistics_command(
                 logger.error(f"Failed to send error message: {send_error}")
 
 
-async def show_individual_stats(interaction: discord.Interaction, user_name: str, dm, logger):
+async def show_individual_stats(interaction: discord.Interaction, user_name: str, adm, logger):
     """Show individual user statistics."""
     logger.debug(f"Showing individual stats for {user_name}")
     
     # Check if user exists
-    if not dm.user_exists(user_name):
+    if not await adm.user_exists(user_name):
         await interaction.response.send_message(
             f"❌ '{user_name}' 유저를 찾을 수 없습니다.", 
             ephemeral=True
@@ -194,12 +194,12 @@ async def show_individual_stats(interaction: discord.Interaction, user_name: str
         return
     
     # Get user data
-    user_data = dm.get_user(user_name)
-    winrate = dm.get_user_winrate(user_name)
+    user_data = await adm.get_user(user_name)
+    winrate = await adm.get_user_winrate(user_name)
     winrate_text = f"{winrate:.1f}%" if winrate is not None else "0%"
     
     # Calculate teammate statistics
-    teammate_stats = calculate_teammate_stats(user_name, dm)
+    teammate_stats = await adm.run(calculate_teammate_stats, user_name, adm.dm)
     best_teammate, worst_teammate = get_best_worst_teammates(teammate_stats, min_games=5)
     
     # Create individual statistics embed
@@ -281,15 +281,15 @@ async def show_individual_stats(interaction: discord.Interaction, user_name: str
     logger.info(f"✅ Individual statistics displayed for {user_name}")
 
 
-async def show_server_stats(interaction: discord.Interaction, dm, logger):
+async def show_server_stats(interaction: discord.Interaction, adm, logger):
     """Show server-wide statistics."""
     logger.debug("Showing server-wide statistics")
     
     # Get all users and matches
-    all_users = dm.get_all_users()
-    total_matches = dm.get_match_count()
+    user_count = await adm.get_user_count()
+    total_matches = await adm.get_match_count()
     
-    if not all_users:
+    if not user_count:
         await interaction.response.send_message(
             "❌ 등록된 유저가 없습니다.", 
             ephemeral=True
@@ -297,23 +297,17 @@ async def show_server_stats(interaction: discord.Interaction, dm, logger):
         return
     
     # Calculate leaderboards
-    mmr_leaderboard = dm.get_leaderboard("mmr")
+    mmr_leaderboard = await adm.get_leaderboard("mmr")
     
     # Win rate leaderboard (5+ games only)
-    winrate_leaderboard = []
-    for user_data in mmr_leaderboard:
-        if user_data["total_games"] >= 5:
-            winrate = (user_data["wins"] / user_data["total_games"]) * 100
-            user_data["winrate"] = winrate
-            winrate_leaderboard.append(user_data)
-    
-    winrate_leaderboard.sort(key=lambda x: x["winrate"], reverse=True)
+    winrate_leaderboard = [user for user in mmr_leaderboard if user.total_games >= 5]
+    winrate_leaderboard.sort(key=lambda x: x.winrate, reverse=True)
     
     # Most active player (most games)
-    most_active = max(mmr_leaderboard, key=lambda x: x["total_games"])
+    most_active = max(mmr_leaderboard, key=lambda x: x.total_games)
     
     # Calculate team formation reliability
-    reliability, games_needed = calculate_team_formation_reliability(dm)
+    reliability, games_needed = await adm.run(calculate_team_formation_reliability, adm.dm)
     
     # Create server statistics embed
     embed = discord.Embed(
@@ -330,12 +324,12 @@ async def show_server_stats(interaction: discord.Interaction, dm, logger):
     
     embed.add_field(
         name="👥 등록된 유저",
-        value=f"{len(all_users)}명",
+        value=f"{user_count}명",
         inline=True
     )
     
     # Average MMR
-    avg_mmr = sum(user["mmr"] for user in mmr_leaderboard) / len(mmr_leaderboard)
+    avg_mmr = sum(user.mmr for user in mmr_leaderboard) / len(mmr_leaderboard)
     embed.add_field(
         name="📈 평균 MMR",
         value=f"{avg_mmr:.0f}",
@@ -347,7 +341,7 @@ async def show_server_stats(interaction: discord.Interaction, dm, logger):
         mmr_top3 = mmr_leaderboard[:3]
         mmr_ranking = []
         for i, user in enumerate(mmr_top3):
-            mmr_ranking.append(f"{i+1}. **{user['name']}** ({user['mmr']} MMR)")
+            mmr_ranking.append(f"{i+1}. **{user.name}** ({user.mmr} MMR)")
         
         embed.add_field(
             name="👑 MMR 랭킹",
@@ -360,7 +354,7 @@ async def show_server_stats(interaction: discord.Interaction, dm, logger):
         winrate_top3 = winrate_leaderboard[:3]
         winrate_ranking = []
         for i, user in enumerate(winrate_top3):
-            winrate_ranking.append(f"{i+1}. **{user['name']}** ({user['winrate']:.1f}%)")
+            winrate_ranking.append(f"{i+1}. **{user.name}** ({user.winrate:.1f}%)")
         
         embed.add_field(
             name="🏆 승률 랭킹",
@@ -371,7 +365,7 @@ async def show_server_stats(interaction: discord.Interaction, dm, logger):
     # Most active player
     embed.add_field(
         name="🎯 내전 단골",
-        value=f"**{most_active['name']}**\n{most_active['total_games']}게임 참여",
+        value=f"**{most_active.name}**\n{most_active.total_games}게임 참여",
         inline=True
     )
     
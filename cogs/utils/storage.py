@@ -0,0 +1,478 @@
+"""
+Storage Backends for DataManager
+================================
+
+Persistence layer used by DataManager. DataManager keeps users and matches
+in memory and hands every change to a backend:
+
+- JsonStorage: data/users.json + data/matches.json snapshots (or one compact
+  data/snapshot.bin, see binary_snapshot.py) with an append-only journal
+  (data/journal.jsonl)
+- SQLiteStorage: a single SQLite database in WAL mode with per-row writes
+
+Every backend implements the same small interface:
+
+    signature()  -> token that changes when the stored data changes on disk
+    load()       -> (users, matches) dictionaries
+    commit(users, matches, changed_users, changed_matches, expected_signature)
+                 -> atomically persist the given keys (a key missing from
+                    the dict is deleted) and return the new signature. With
+                    expected_signature this is a compare-and-swap:
+                    StorageConflictError is raised and nothing is written
+                    if another writer committed first.
+    close()
+
+File: cogs/utils/storage.py
+Author: Juan Dodam
+Version: 1.4.0 - Compare-and-swap commits
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from cogs.utils.binary_snapshot import save_snapshot, load_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+
+class StorageConflictError(Exception):
+    """Raised by commit() when the stored data changed since the expected signature."""
+
+
+class JsonStorage:
+    """
+    Stores users and matches as JSON snapshots plus a shared journal.
+    
+    Every commit appends exactly one fsync'd line to the journal holding
+    all changed users and matches, so a write costs O(1) I/O and a match
+    with its ten player updates lands atomically. Once the journal holds
+    `compact_threshold` entries it is folded into the snapshots. Loading
+    reads the snapshots and replays the journal on top of them.
+    
+    Processes sharing the directory coordinate through a lock file
+    (data/.lock): loads hold it shared, commits and compaction exclusive.
+    """
+    
+    def __init__(self, data_dir: Path, compact_threshold: int = 200, 
+                 snapshot_format: str = "json"):
+        """
+        Initialize JSON storage inside the given data directory.
+        
+        Args:
+            data_dir: Directory holding the data files
+            compact_threshold: Journal entries before compacting into the snapshots
+            snapshot_format: "json" (users.json/matches.json) or "binary" (snapshot.bin)
+        """
+        if snapshot_format not in ("json", "binary"):
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
+        
+        self.data_dir = Path(data_dir)
+        self.users_file = self.data_dir / "users.json"
+        self.matches_file = self.data_dir / "matches.json"
+        self.snapshot_file = self.data_dir / "snapshot.bin"
+        self.journal_file = self.data_dir / "journal.jsonl"
+        self.lock_file = self.data_dir / ".lock"
+        self.compact_threshold = compact_threshold
+        self.snapshot_format = snapshot_format
+        
+        # Number of entries currently in the journal (counted on load)
+        self._journal_entries = 0
+        
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Create empty JSON files if they don't exist
+        if not self.users_file.exists():
+            self._save_json(self.users_file, {})
+        if not self.matches_file.exists():
+            self._save_json(self.matches_file, {})
+    
+    def _file_signature(self, file_path: Path) -> Optional[Tuple[int, int]]:
+        """Get (mtime, size) of a file, or None if it doesn't exist."""
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """Hold the data directory lock across processes (no-op without fcntl)."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_file, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _load_json(self, file_path: Path) -> Dict[str, Any]:
+        """Load JSON data from file."""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _save_json(self, file_path: Path, data: Dict[str, Any]):
+        """Save JSON data to file atomically (write temp file, then rename)."""
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    
+    # ===== JOURNAL =====
+    
+    def _replay_journal(self, users: Dict[str, Any], matches: Dict[str, Any]) -> int:
+        """
+        Apply journal entries on top of the snapshots.
+        
+        A partial last line left by a crash is cut off so later appends
+        start on a clean line.
+        
+        Returns:
+            int: Number of entries replayed
+        """
+        entries = 0
+        valid_bytes = 0
+        try:
+            with open(self.journal_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self._apply_changes(users, entry["users"])
+                    self._apply_changes(matches, entry["matches"])
+                    entries += 1
+                    valid_bytes += len(line)
+        except FileNotFoundError:
+            return 0
+        
+        if valid_bytes < self.journal_file.stat().st_size:
+            os.truncate(self.journal_file, valid_bytes)
+        return entries
+    
+    def _apply_changes(self, data: Dict[str, Any], changes: Dict[str, Any]):
+        """Apply journaled records to data (None means deleted)."""
+        for key, record in changes.items():
+            if record is None:
+                data.pop(key, None)
+            else:
+                data[key] = record
+    
+    def _append_journal(self, entry: Dict[str, Any]):
+        """Append one journal line and fsync."""
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_entries += 1
+    
+    def compact(self, users: Dict[str, Any], matches: Dict[str, Any]):
+        """Write the snapshot(s) and truncate the journal."""
+        with self._locked():
+            self._compact(users, matches)
+    
+    def _compact(self, users: Dict[str, Any], matches: Dict[str, Any]):
+        """compact() for callers already holding the lock."""
+        # Replaying an entry twice is harmless, so a crash before the journal
+        # is truncated only leaves already-applied entries behind.
+        if self.snapshot_format == "binary":
+            save_snapshot(self.snapshot_file, users, matches)
+        else:
+            self._save_json(self.users_file, users)
+            self._save_json(self.matches_file, matches)
+        with open(self.journal_file, 'w', encoding='utf-8'):
+            pass
+        self._journal_entries = 0
+    
+    # ===== BACKEND INTERFACE =====
+    
+    def signature(self) -> Tuple:
+        """Signature of the data files; changes whenever any of them is written."""
+        return (self._file_signature(self.users_file),
+                self._file_signature(self.matches_file),
+                self._file_signature(self.snapshot_file),
+                self._file_signature(self.journal_file))
+    
+    def load(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Load the snapshot(s) with the journal replayed on top."""
+        binary = self.snapshot_format == "binary"
+        with self._locked(exclusive=False):
+            if binary and self.snapshot_file.exists():
+                users, matches = load_snapshot(self.snapshot_file)
+            else:
+                users = self._load_json(self.users_file)
+                matches = self._load_json(self.matches_file)
+            self._journal_entries = self._replay_journal(users, matches)
+        
+        if binary and not self.snapshot_file.exists():
+            # First start in binary mode: convert the JSON data once
+            self.compact(users, matches)
+        return users, matches
+    
+    def commit(self, users: Dict[str, Any], matches: Dict[str, Any],
+               changed_users: Iterable[str] = (), changed_matches: Iterable[str] = (),
+               expected_signature=None):
+        """
+        Journal all changed users and matches as a single entry.
+        
+        Returns:
+            Signature of the files right after this commit
+        
+        Raises:
+            StorageConflictError: The files changed since expected_signature
+        """
+        entry = {
+            "users": {name: users.get(name) for name in changed_users},
+            "matches": {match_id: matches.get(match_id) for match_id in changed_matches}
+        }
+        if not entry["users"] and not entry["matches"]:
+            return expected_signature if expected_signature is not None else self.signature()
+        
+        with self._locked():
+            if expected_signature is not None and self.signature() != expected_signature:
+                raise StorageConflictError("Data files changed since they were loaded")
+            self._append_journal(entry)
+            if self._journal_entries >= self.compact_threshold:
+                self._compact(users, matches)
+            return self.signature()
+    
+    def close(self):
+        """Nothing to release for plain files."""
+
+
+class SQLiteStorage:
+    """
+    Stores users and matches in a SQLite database (WAL mode).
+    
+    Team membership lives in its own table so per-player and per-date
+    lookups are served by indexes, and recording a match only inserts
+    a handful of rows instead of rewriting the whole history.
+    """
+    
+    USER_COLUMNS = ("tier", "rank", "main_position", "sub_position",
+                    "mmr", "wins", "losses", "total_games")
+    MATCH_COLUMNS = ("date", "winner", "mvp")
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            name TEXT PRIMARY KEY,
+            tier TEXT,
+            rank TEXT,
+            main_position TEXT,
+            sub_position TEXT,
+            mmr INTEGER,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            total_games INTEGER NOT NULL DEFAULT 0,
+            extra TEXT
+        );
+        CREATE TABLE IF NOT EXISTS matches (
+            match_id TEXT PRIMARY KEY,
+            date TEXT,
+            winner TEXT,
+            mvp TEXT,
+            extra TEXT
+        );
+        CREATE TABLE IF NOT EXISTS match_players (
+            match_id TEXT NOT NULL REFERENCES matches(match_id) ON DELETE CASCADE,
+            team TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            player TEXT NOT NULL,
+            PRIMARY KEY (match_id, team, slot)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(date, match_id);
+        CREATE INDEX IF NOT EXISTS idx_match_players_player ON match_players(player, match_id);
+    """
+    
+    def __init__(self, db_path: Path, json_dir: Optional[Path] = None):
+        """
+        Open (and create if needed) the SQLite database.
+        
+        Args:
+            db_path: Path to the database file
+            json_dir: Directory holding legacy users.json/matches.json to
+                      migrate from on first start (optional)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(self.SCHEMA)
+        
+        if json_dir is not None:
+            self.migrate_from_json(Path(json_dir))
+    
+    # ===== MIGRATION =====
+    
+    def migrate_from_json(self, json_dir: Path) -> bool:
+        """
+        One-shot import of users.json/matches.json into an empty database.
+        
+        Returns:
+            bool: True if data was imported, False if already migrated
+        """
+        if self._get_meta("json_migrated"):
+            return False
+        
+        json_files = (json_dir / "users.json", json_dir / "matches.json")
+        users, matches = {}, {}
+        if all(path.exists() for path in json_files):
+            users, matches = JsonStorage(json_dir).load()
+        
+        with self.conn:
+            self._write_users(users, users.keys())
+            self._write_matches(matches, matches.keys())
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                (str(json_dir),)
+            )
+        return True
+    
+    def _get_meta(self, key: str) -> Optional[str]:
+        """Read a value from the meta table."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    # ===== BACKEND INTERFACE =====
+    
+    def signature(self) -> int:
+        """SQLite data_version; changes when another connection commits."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+    
+    def load(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Load all users and matches."""
+        users = {}
+        columns = ", ".join(self.USER_COLUMNS)
+        for row in self.conn.execute(f"SELECT name, {columns}, extra FROM users"):
+            record = dict(zip(self.USER_COLUMNS, row[1:-1]))
+            if row[-1]:
+                record.update(json.loads(row[-1]))
+            users[row[0]] = record
+        
+        matches = {}
+        columns = ", ".join(self.MATCH_COLUMNS)
+        for row in self.conn.execute(f"SELECT match_id, {columns}, extra FROM matches "
+                                     "ORDER BY date, match_id"):
+            record = {"date": row[1], "blue_team": [], "red_team": [],
+                      "winner": row[2], "mvp": row[3]}
+            if row[-1]:
+                record.update(json.loads(row[-1]))
+            matches[row[0]] = record
+        
+        for match_id, team, player in self.conn.execute(
+                "SELECT match_id, team, player FROM match_players ORDER BY match_id, team, slot"):
+            if match_id in matches:
+                matches[match_id][f"{team}_team"].append(player)
+        
+        return users, matches
+    
+    def commit(self, users: Dict[str, Any], matches: Dict[str, Any],
+               changed_users: Iterable[str] = (), changed_matches: Iterable[str] = (),
+               expected_signature=None):
+        """
+        Upsert or delete the changed rows in a single transaction.
+        
+        Returns:
+            Signature right after this commit (own commits don't change data_version)
+        
+        Raises:
+            StorageConflictError: Another connection committed since expected_signature
+        """
+        with self.conn:
+            # Take the write lock first so the check and the writes are atomic
+            self.conn.execute("BEGIN IMMEDIATE")
+            if expected_signature is not None and self.signature() != expected_signature:
+                raise StorageConflictError("Database changed since it was loaded")
+            self._write_users(users, changed_users)
+            self._write_matches(matches, changed_matches)
+            return self.signature()
+    
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+    
+    # ===== ROW HELPERS =====
+    
+    def _write_users(self, users: Dict[str, Any], names: Iterable[str]):
+        """Upsert the given users, deleting the ones missing from `users`."""
+        placeholders = ", ".join("?" for _ in self.USER_COLUMNS)
+        columns = ", ".join(self.USER_COLUMNS)
+        for name in names:
+            record = users.get(name)
+            if record is None:
+                self.conn.execute("DELETE FROM users WHERE name = ?", (name,))
+                continue
+            extra = {k: v for k, v in record.items() if k not in self.USER_COLUMNS}
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO users (name, {columns}, extra) "
+                f"VALUES (?, {placeholders}, ?)",
+                (name, *(record.get(col) for col in self.USER_COLUMNS),
+                 json.dumps(extra, ensure_ascii=False) if extra else None)
+            )
+    
+    def _write_matches(self, matches: Dict[str, Any], match_ids: Iterable[str]):
+        """Upsert the given matches, deleting the ones missing from `matches`."""
+        for match_id in match_ids:
+            record = matches.get(match_id)
+            self.conn.execute("DELETE FROM matches WHERE match_id = ?", (match_id,))
+            if record is None:
+                continue
+            
+            skip = set(self.MATCH_COLUMNS) | {"blue_team", "red_team"}
+            extra = {k: v for k, v in record.items() if k not in skip}
+            self.conn.execute(
+                "INSERT INTO matches (match_id, date, winner, mvp, extra) VALUES (?, ?, ?, ?, ?)",
+                (match_id, record.get("date"), record.get("winner"), record.get("mvp"),
+                 json.dumps(extra, ensure_ascii=False) if extra else None)
+            )
+            self.conn.executemany(
+                "INSERT INTO match_players (match_id, team, slot, player) VALUES (?, ?, ?, ?)",
+                [(match_id, team, slot, player)
+                 for team in ("blue", "red")
+                 for slot, player in enumerate(record.get(f"{team}_team", []))]
+            )
+
+
+def create_storage(backend: str, data_dir: Path, sqlite_filename: str = "bot.db",
+                   compact_threshold: int = 200, snapshot_format: str = "json"):
+    """
+    Create a storage backend by name.
+    
+    Args:
+        backend: "json" or "sqlite"
+        data_dir: Directory holding the data files
+        sqlite_filename: Database file name inside data_dir (sqlite only)
+        compact_threshold: Journal entries before compaction (json only)
+        snapshot_format: "json" or "binary" snapshot files (json only)
+    
+    Returns:
+        Storage backend instance
+    """
+    data_dir = Path(data_dir)
+    if backend == "sqlite":
+        return SQLiteStorage(data_dir / sqlite_filename, json_dir=data_dir)
+    if backend == "json":
+        return JsonStorage(data_dir, compact_threshold, snapshot_format)
+    raise ValueError(f"Unknown storage backend: {backend}")
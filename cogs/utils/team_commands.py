@@ -2,38 +2,66 @@
 Team Formation Slash Command - Enhanced with Multiple Balancing Options
 ======================================================================
 
-A slash command for creating balanced teams for LOL internal matches with 3 different balancing strategies.
+A slash command for creating balanced teams for LOL internal matches with 4 different balancing strategies.
 
 File: cogs/utils/team_commands.py
 Author: Juan Dodam
-Version: 2.0.1
+Version: 2.12.1 - Team size option (positions only for teams of five)
 """
 
 import discord
 from discord import app_commands
+import asyncio
 import traceback
-import random
+import functools
+import math
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime  # 추가된 import
+from itertools import combinations, permutations
 from typing import List, Dict, Any, Tuple, Optional
-from cogs.utils.data_manager import get_data_manager
+import settings
+from cogs.utils.data_manager import get_async_data_manager
+from cogs.utils import rating_engine
+from cogs.utils.team_balancer import choose_bench, balance_multi_teams, find_lane_conflict, describe_lane_conflict
 
+try:
+    import numpy as np
+except ImportError:  # Splits are scored in pure Python instead
+    np = None
 
-def calculate_adjusted_mmr(player: str, dm) -> int:
-    """Calculate MMR adjusted by win rate from match history with confidence scaling."""
-    user_data = dm.get_user(player)
+POSITIONS = ["탑", "정글", "미드", "원딜", "서폿"]
+
+
+def player_won(match, player: str) -> bool:
+    """Check if the player was on the winning team of a match."""
+    team = "blue" if player in match['blue_team'] else "red"
+    return match.get('winner') == team
+
+
+def calculate_adjusted_mmr(player: str, dm, user_data=None, matches=None) -> int:
+    """
+    Calculate MMR adjusted by win rate from match history with confidence scaling.
+    
+    user_data/matches can be passed in when the caller already has them.
+    """
+    if user_data is None:
+        user_data = dm.get_user(player)
     if not user_data:
         return 1000  # Default MMR
     
     base_mmr = user_data['mmr']
     
     # Get match history
-    matches = dm.get_user_matches(player)
+    if matches is None:
+        matches = dm.get_user_matches(player)
     if not matches:
         return base_mmr
     
     # Calculate overall win rate
     total_games = len(matches)
-    wins = sum(1 for match in matches if match.get('result') == 'win')
+    wins = sum(1 for match in matches if player_won(match, player))
     win_rate = wins / total_games if total_games > 0 else 0.5
     
     # Confidence scaling based on total number of games
@@ -58,16 +86,22 @@ def calculate_adjusted_mmr(player: str, dm) -> int:
     return int(adjusted_mmr)
 
 
-def calculate_recent_form_mmr(player: str, dm) -> int:
-    """Calculate MMR based on recent 5 games performance with confidence scaling."""
-    user_data = dm.get_user(player)
+def calculate_recent_form_mmr(player: str, dm, user_data=None, matches=None) -> int:
+    """
+    Calculate MMR based on recent 5 games performance with confidence scaling.
+    
+    user_data/matches can be passed in when the caller already has them.
+    """
+    if user_data is None:
+        user_data = dm.get_user(player)
     if not user_data:
         return 1000
     
     base_mmr = user_data['mmr']
     
     # Get match history
-    matches = dm.get_user_matches(player)
+    if matches is None:
+        matches = dm.get_user_matches(player)
     if not matches:
         return base_mmr
     
@@ -90,7 +124,7 @@ def calculate_recent_form_mmr(player: str, dm) -> int:
         return base_mmr
     
     # Calculate recent win rate
-    recent_wins = sum(1 for match in recent_matches if match.get('result') == 'win')
+    recent_wins = sum(1 for match in recent_matches if player_won(match, player))
     recent_win_rate = recent_wins / len(recent_matches)
     recent_games_count = len(recent_matches)
     
@@ -114,19 +148,120 @@ def calculate_recent_form_mmr(player: str, dm) -> int:
     return int(adjusted_mmr)
 
 
-def calculate_team_mmr_adjusted(players: List[str], dm, mmr_type: str = "base") -> int:
-    """Calculate total MMR for a team with different MMR calculation methods."""
-    total_mmr = 0
-    for player in players:
-        if mmr_type == "adjusted":
-            mmr = calculate_adjusted_mmr(player, dm)
-        elif mmr_type == "recent":
-            mmr = calculate_recent_form_mmr(player, dm)
-        else:  # base
+def shrunk_logit(wins: float, games: float, prior_rate: float = 0.5,
+                 prior_games: float = None) -> float:
+    """Log-odds of a win rate pulled toward prior_rate by prior_games virtual games."""
+    prior_games = settings.SYNERGY_PRIOR_GAMES if prior_games is None else prior_games
+    rate = (wins + prior_rate * prior_games) / (games + prior_games)
+    rate = min(max(rate, 1e-6), 1 - 1e-6)
+    return math.log(rate / (1 - rate))
+
+
+def calculate_synergy_matrix(players: List[str], dm, records: Dict[str, Tuple[int, int]]) -> List[List[float]]:
+    """
+    Pairwise teammate synergy of the players, in log-odds.
+    
+    synergy[i][j] = shrunk log-odds of the pair's win rate together minus
+    the mean of the two players' own shrunk log-odds, so it is the pair
+    effect beyond individual strength (0 for pairs that never teamed up).
+    Pair counts come from DataManager's incrementally maintained index.
+    
+    Args:
+        players: Player names (matrix order)
+        dm: DataManager
+        records: Player -> (wins, games)
+    """
+    own = {player: shrunk_logit(*records[player]) for player in players}
+    index = {player: i for i, player in enumerate(players)}
+    synergy = [[0.0] * len(players) for _ in players]
+    
+    for (a, b), (games, wins) in dm.get_pair_stats(players).items():
+        prior_rate = 1 / (1 + math.exp(-(own[a] + own[b]) / 2))
+        effect = shrunk_logit(wins, games, prior_rate) - (own[a] + own[b]) / 2
+        synergy[index[a]][index[b]] = synergy[index[b]][index[a]] = effect
+    
+    return synergy
+
+
+class RatingSnapshot:
+    """
+    Ratings and positions of the selected players, computed once per command.
+    
+    "adjusted" MMR is the incremental rating DataManager stores on every
+    recorded match (rating_engine). Only players with games but no stored
+    rating yet (data from before the rating engine, until
+    DataManager.recompute_ratings runs) fall back to calculate_adjusted_mmr.
+    "recent" MMR is the recent-form rating (calculate_recent_form_mmr), read
+    from each player's indexed match list once. The balancers and embeds
+    only look values up here.
+    """
+    
+    def __init__(self, players: List[str], dm):
+        self.players = list(players)
+        self.base: Dict[str, int] = {}
+        self.adjusted: Dict[str, int] = {}
+        self.recent: Dict[str, int] = {}
+        self.rating_sigma: Dict[str, float] = {}
+        self.main_positions: Dict[str, Optional[str]] = {}
+        self.sub_positions: Dict[str, Optional[str]] = {}
+        records: Dict[str, Tuple[int, int]] = {}
+        
+        for player in self.players:
             user_data = dm.get_user(player)
-            mmr = user_data['mmr'] if user_data else 1000
-        total_mmr += mmr
-    return total_mmr
+            matches = dm.get_user_matches(player) if user_data and user_data['total_games'] else []
+            self.base[player] = user_data['mmr'] if user_data else 1000
+            rating, self.rating_sigma[player] = rating_engine.get_rating(user_data)
+            if matches and 'rating' not in user_data:
+                rating = calculate_adjusted_mmr(player, dm, user_data, matches)
+            self.adjusted[player] = int(round(rating))
+            self.recent[player] = calculate_recent_form_mmr(player, dm, user_data, matches)
+            self.main_positions[player] = user_data['main_position'] if user_data else None
+            self.sub_positions[player] = user_data['sub_position'] if user_data else None
+            records[player] = (user_data['wins'], user_data['total_games']) if user_data else (0, 0)
+        
+        self.position_map = get_player_positions(self.players, dm)
+        self.synergy = calculate_synergy_matrix(self.players, dm, records)
+    
+    def mmr(self, player: str, mmr_type: str = "base") -> int:
+        """MMR of one player (base, adjusted or recent)."""
+        if mmr_type == "adjusted":
+            return self.adjusted[player]
+        if mmr_type == "recent":
+            return self.recent[player]
+        return self.base[player]
+    
+    def mmrs(self, players: List[str], mmr_type: str = "base") -> List[int]:
+        """MMRs of several players, in the given order."""
+        return [self.mmr(player, mmr_type) for player in players]
+    
+    def team_mmr(self, players: List[str], mmr_type: str = "base") -> int:
+        """Calculate total MMR for a team with different MMR calculation methods."""
+        return sum(self.mmrs(players, mmr_type))
+    
+    def pair_effect(self, players: List[str]) -> float:
+        """Mean teammate synergy over every pair of a team (log-odds)."""
+        index = [self.players.index(player) for player in players]
+        pairs = list(combinations(index, 2))
+        return sum(self.synergy[i][j] for i, j in pairs) / len(pairs) if pairs else 0.0
+    
+    def win_probability(self, blue_team: List[str], red_team: List[str], mmr_type: str = "adjusted") -> float:
+        """Predicted blue win probability from the average MMR edge plus teammate synergy."""
+        mmr_edge = (self.team_mmr(blue_team, mmr_type) - self.team_mmr(red_team, mmr_type)) / len(blue_team)
+        logit = (mmr_edge * math.log(10) / settings.WIN_PROBABILITY_SCALE
+                 + settings.SYNERGY_WEIGHT * (self.pair_effect(blue_team) - self.pair_effect(red_team)))
+        return 1 / (1 + math.exp(-logit))
+    
+    def placement_cost(self, player: str, position: str) -> int:
+        """
+        Discomfort of playing a lane: 0 main position, 1 sub position
+        (including "X 빼고"), 2 any other lane the player allows (모두가능).
+        """
+        if self.main_positions[player] == position:
+            return 0
+        sub_pos = self.sub_positions[player] or ""
+        if sub_pos == position or (sub_pos.endswith(" 빼고") and sub_pos != f"{position} 빼고"):
+            return 1
+        return 2
 
 
 def get_player_positions(players: List[str], dm) -> Dict[str, List[str]]:
@@ -175,9 +310,27 @@ def get_player_positions(players: List[str], dm) -> Dict[str, List[str]]:
     return position_map
 
 
-def get_position_availability_info(players: List[str], dm) -> str:
+def get_play_history(dm, day: str = None) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Games each player played on a day (default today), for fair benching.
+    
+    Returns:
+        Tuple: (player -> games that day, player -> index of their latest game that day)
+    """
+    day = day or datetime.now().strftime("%Y-%m-%d")
+    games_today: Dict[str, int] = {}
+    last_played: Dict[str, int] = {}
+    
+    for index, match in enumerate(dm.get_matches_between(day, day)):
+        for player in match.blue_team + match.red_team:
+            games_today[player] = games_today.get(player, 0) + 1
+            last_played[player] = index
+    
+    return games_today, last_played
+
+
+def get_position_availability_info(position_map: Dict[str, List[str]]) -> str:
     """Get detailed information about position availability for debugging."""
-    position_map = get_player_positions(players, dm)
     info_lines = []
     
     for pos, candidates in position_map.items():
@@ -186,140 +339,442 @@ def get_position_availability_info(players: List[str], dm) -> str:
     return "\n".join(info_lines)
 
 
-def balance_teams_option1(players: List[str], dm) -> Tuple[Optional[List[str]], Optional[List[str]], Optional[str]]:
-    """Option 1: Win rate adjusted MMR + Position consideration."""
-    if len(players) != 10:
-        return None, None, "정확히 10명의 플레이어가 필요합니다."
+def balance_teams_option1(snapshot: RatingSnapshot) -> Tuple[Optional[List[str]], Optional[List[str]], Optional[str],
+                                                            Optional[Tuple[List[str], List[str]]]]:
+    """
+    Option 1: Win rate adjusted MMR + Position consideration.
     
-    position_map = get_player_positions(players, dm)
+    Every lane-valid split is scored on team MMR difference, lane opponent
+    MMR difference and placement discomfort; from the Pareto front of
+    those, the "most fair" split (settings.BALANCE_FAIR_WEIGHTS) is the
+    answer and the "most comfortable" one (settings.BALANCE_COMFORT_WEIGHTS)
+    comes along for free.
     
-    # Check if all positions can be filled and provide detailed error message
-    insufficient_positions = []
-    for pos, candidates in position_map.items():
-        if len(candidates) < 2:
-            insufficient_positions.append(f"{pos}({len(candidates)}명)")
+    Returns:
+        Tuple: (blue_team, red_team, error message, comfortable (blue, red)
+        or None when it is the same split). Teams are in lane order.
+    """
+    players = snapshot.players
+    if len(players) != 10:
+        return None, None, "정확히 10명의 플레이어가 필요합니다.", None
+    
+    position_map = snapshot.position_map
     
-    if insufficient_positions:
-        position_info = get_position_availability_info(players, dm)
-        error_msg = (f"포지션별 플레이어가 부족합니다: {', '.join(insufficient_positions)}\n\n"
+    # Check that both teams can fill every lane before scoring any split,
+    # naming the lanes/players that make it impossible
+    conflict = find_lane_conflict(players, position_map)
+    if conflict:
+        position_info = get_position_availability_info(position_map)
+        error_msg = (f"{describe_lane_conflict(conflict)}\n\n"
                     f"현재 포지션별 가능 인원:\n{position_info}")
-        return None, None, error_msg
+        return None, None, error_msg, None
     
-    best_blue = None
-    best_red = None
-    best_mmr_diff = float('inf')
+    # Every split where both teams can cover all five lanes
+    front = pareto_front(split_objectives(snapshot, "adjusted", use_positions=True))
+    if not front:
+        return None, None, "팀 밸런싱에 실패했습니다.", None
     
-    for _ in range(1500):  # More iterations for better balance
-        blue_team = []
-        red_team = []
-        used_players = set()
-        success = True
-        
-        for position in ["탑", "정글", "미드", "원딜", "서폿"]:
-            available = [p for p in position_map[position] if p not in used_players]
-            if len(available) < 2:
-                success = False
-                break
-            
-            selected = random.sample(available, 2)
-            blue_team.append(selected[0])
-            red_team.append(selected[1])
-            used_players.update(selected)
+    fair = pick_from_front(front, settings.BALANCE_FAIR_WEIGHTS)
+    comfortable = pick_from_front(front, settings.BALANCE_COMFORT_WEIGHTS)
+    comfortable_teams = None if comfortable is fair else (comfortable[4], comfortable[5])
+    return fair[4], fair[5], None, comfortable_teams
+
+
+def assign_lanes(team: List[str], snapshot: RatingSnapshot) -> Optional[List[str]]:
+    """
+    Assign a team's players to the five lanes under the main/sub-position rules.
+    
+    Searches every valid assignment (at most 5! = 120) and keeps the one
+    with the lowest total placement_cost; ties go to the first found, so
+    the result is deterministic.
+    
+    Returns:
+        Players in lane order (탑, 정글, 미드, 원딜, 서폿), or None if the
+        team cannot cover every lane
+    """
+    positions = POSITIONS
+    candidates = [[p for p in team if p in snapshot.position_map[pos]] for pos in positions]
+    
+    best = None
+    best_cost = float("inf")
+    lanes = []
+    used = set()
+    
+    def search(lane_index: int, cost: int):
+        nonlocal best, best_cost
+        # Bound: even all remaining lanes on main positions can't beat the best
+        if cost >= best_cost:
+            return
+        if lane_index == len(positions):
+            best, best_cost = lanes.copy(), cost
+            return
+        for player in candidates[lane_index]:
+            if player in used:
+                continue
+            used.add(player)
+            lanes.append(player)
+            search(lane_index + 1, cost + snapshot.placement_cost(player, positions[lane_index]))
+            lanes.pop()
+            used.discard(player)
+    
+    search(0, 0)
+    return best
+
+
+def rank_team_splits(players: List[str], mmrs: List[int]) -> List[Tuple[int, int]]:
+    """
+    Rank every split of the players into two equal teams by MMR difference.
+    
+    Teams are bitmasks over the player list (bit i = players[i] on blue).
+    The first player is always on blue, so each split appears once
+    (126 splits for 10 players) and is scored with a handful of integer
+    additions - about 0.1ms for the full ranking.
+    
+    Args:
+        players: Player names (even count)
+        mmrs: MMR of each player, same order as players
+    
+    Returns:
+        List of (mmr_diff, blue_mask), smallest difference first
+        (ties broken by mask, so the order is deterministic)
+    """
+    team_size = len(players) // 2
+    total = sum(mmrs)
+    bits = [(1 << i, mmrs[i]) for i in range(1, len(players))]
+    
+    ranked = []
+    for combo in combinations(bits, team_size - 1):
+        mask, blue_mmr = 1, mmrs[0]
+        for bit, mmr in combo:
+            mask |= bit
+            blue_mmr += mmr
+        ranked.append((abs(total - 2 * blue_mmr), mask))
+    
+    ranked.sort()
+    return ranked
+
+
+def split_from_mask(players: List[str], blue_mask: int) -> Tuple[List[str], List[str]]:
+    """Turn a blue-team bitmask into (blue_team, red_team) name lists."""
+    blue_team = [p for i, p in enumerate(players) if blue_mask >> i & 1]
+    red_team = [p for i, p in enumerate(players) if not blue_mask >> i & 1]
+    return blue_team, red_team
+
+
+def split_objectives(snapshot: RatingSnapshot, mmr_type: str = "adjusted",
+                     use_positions: bool = False) -> List[Tuple[int, int, int, int, List[str], List[str]]]:
+    """
+    Score every split of the snapshot's players on three objectives.
+    
+    - mmr_diff: team MMR difference
+    - lane_diff: sum of MMR differences between lane opponents
+    - discomfort: sum of placement_cost over both teams
+    
+    With use_positions (5v5 only) each team gets its assign_lanes lane
+    order (least discomfort) and splits that can't cover every lane are
+    dropped; without it lane_diff and discomfort are 0. Uses NumPy to
+    score all splits at once when it is installed; the pure-Python path
+    gives the same result.
+    
+    Returns:
+        List of (mmr_diff, lane_diff, discomfort, blue_mask, blue_team, red_team)
+        in no particular order. With use_positions the teams are in lane order.
+    """
+    if use_positions and len(snapshot.players) != 2 * len(POSITIONS):
+        raise ValueError("Lane assignment needs exactly 10 players")
+    
+    if np is not None:
+        return _split_objectives_numpy(snapshot, mmr_type, use_positions)
+    return _split_objectives_python(snapshot, mmr_type, use_positions)
+
+
+def rank_splits(snapshot: RatingSnapshot, mmr_type: str = "adjusted", use_positions: bool = False,
+                lane_weight: float = 0.0, discomfort_weight: float = 0.0) -> List[Tuple[float, int, List[str], List[str]]]:
+    """
+    Rank every split by a weighted sum of its split_objectives.
+    
+    score = mmr_diff + lane_weight * lane_diff + discomfort_weight * discomfort
+    
+    Returns:
+        List of (score, blue_mask, blue_team, red_team), best first
+        (ties broken by mask). With use_positions the teams are in lane order.
+    """
+    ranked = [(mmr_diff + lane_weight * lane_diff + discomfort_weight * discomfort, mask, blue, red)
+              for mmr_diff, lane_diff, discomfort, mask, blue, red
+              in split_objectives(snapshot, mmr_type, use_positions)]
+    ranked.sort(key=lambda x: (x[0], x[1]))
+    return ranked
+
+
+def pareto_front(objectives: List[Tuple]) -> List[Tuple]:
+    """
+    Splits no other split beats on all of (mmr_diff, lane_diff, discomfort).
+    
+    Args:
+        objectives: Entries from split_objectives
+    
+    Returns:
+        The non-dominated entries, smallest mmr_diff first (ties by mask)
+    """
+    ordered = sorted(objectives, key=lambda x: (x[:3], x[3]))
+    front = []
+    for entry in ordered:
+        # Only an earlier entry can dominate; equal objectives keep the first
+        if not any(other[1] <= entry[1] and other[2] <= entry[2] for other in front):
+            front.append(entry)
+    return front
+
+
+def pick_from_front(front: List[Tuple], weights: Tuple[float, float, float]) -> Tuple:
+    """Front entry with the lowest weighted objective sum (ties by objectives in order, then mask)."""
+    return min(front, key=lambda x: (sum(w * v for w, v in zip(weights, x[:3])), *x[:4]))
+
+
+def _split_objectives_python(snapshot: RatingSnapshot, mmr_type: str,
+                             use_positions: bool) -> List[Tuple[int, int, int, int, List[str], List[str]]]:
+    """split_objectives scoring one split at a time."""
+    players = snapshot.players
+    scored = []
+    for mmr_diff, blue_mask in rank_team_splits(players, snapshot.mmrs(players, mmr_type)):
+        blue_team, red_team = split_from_mask(players, blue_mask)
+        lane_diff = discomfort = 0
         
-        if not success:
-            continue
+        if use_positions:
+            blue_team = assign_lanes(blue_team, snapshot)
+            red_team = assign_lanes(red_team, snapshot) if blue_team else None
+            if blue_team is None or red_team is None:
+                continue
+            lane_diff = sum(abs(snapshot.mmr(blue, mmr_type) - snapshot.mmr(red, mmr_type))
+                            for blue, red in zip(blue_team, red_team))
+            discomfort = sum(snapshot.placement_cost(player, position)
+                             for team in (blue_team, red_team)
+                             for player, position in zip(team, POSITIONS))
         
-        blue_mmr = calculate_team_mmr_adjusted(blue_team, dm, "adjusted")
-        red_mmr = calculate_team_mmr_adjusted(red_team, dm, "adjusted")
-        mmr_diff = abs(blue_mmr - red_mmr)
+        scored.append((mmr_diff, lane_diff, discomfort, blue_mask, blue_team, red_team))
+    
+    return scored
+
+
+@functools.lru_cache(maxsize=None)
+def _split_tables(count: int):
+    """
+    NumPy tables describing every split of `count` players (player 0 on blue).
+    
+    Returns:
+        Tuple: (masks[S], members[S, count] bool, blue_index[S, team],
+                red_index[S, team], lane_orders[team!, team])
+    """
+    team_size = count // 2
+    blue_index = np.array([(0,) + others for others in combinations(range(1, count), team_size - 1)])
+    members = np.zeros((len(blue_index), count), dtype=bool)
+    np.put_along_axis(members, blue_index, True, axis=1)
+    red_index = np.nonzero(~members)[1].reshape(len(blue_index), team_size)
+    masks = members.astype(np.int64) @ (1 << np.arange(count, dtype=np.int64))
+    lane_orders = np.array(list(permutations(range(team_size))))
+    return masks, members, blue_index, red_index, lane_orders
+
+
+def _best_lane_orders(team_index, lane_orders, eligible, cost):
+    """
+    For every team (rows of team_index), pick the valid lane order with the
+    lowest total placement cost.
+    
+    Returns:
+        Tuple: (lanes[S, 5] player index per lane, discomfort[S], valid[S])
+    """
+    lanes = team_index[:, lane_orders]                    # [S, 120, 5]
+    lane_ids = np.arange(lane_orders.shape[1])
+    valid = eligible[lanes, lane_ids].all(axis=2)         # [S, 120]
+    discomfort = cost[lanes, lane_ids].sum(axis=2)        # [S, 120]
+    # Invalid orders can never be cheapest, so argmin picks the first best
+    # valid order, the same one assign_lanes finds
+    key = np.where(valid, discomfort, np.iinfo(np.int64).max)
+    best = key.argmin(axis=1)
+    rows = np.arange(len(team_index))
+    return lanes[rows, best], discomfort[rows, best], valid.any(axis=1)
+
+
+def _split_objectives_numpy(snapshot: RatingSnapshot, mmr_type: str,
+                            use_positions: bool) -> List[Tuple[int, int, int, int, List[str], List[str]]]:
+    """split_objectives scoring all splits at once with NumPy."""
+    players = snapshot.players
+    masks, members, blue_index, red_index, lane_orders = _split_tables(len(players))
+    mmr = np.array(snapshot.mmrs(players, mmr_type), dtype=np.int64)
+    
+    blue_mmr = members @ mmr
+    mmr_diff = np.abs(mmr.sum() - 2 * blue_mmr)
+    lane_diff = np.zeros_like(mmr_diff)
+    discomfort = np.zeros_like(mmr_diff)
+    valid = np.ones(len(masks), dtype=bool)
+    
+    if use_positions:
+        eligible = np.array([[player in snapshot.position_map[pos] for pos in POSITIONS]
+                             for player in players])
+        cost = np.array([[snapshot.placement_cost(player, pos) for pos in POSITIONS]
+                         for player in players], dtype=np.int64)
+        blue_index, blue_cost, blue_valid = _best_lane_orders(blue_index, lane_orders, eligible, cost)
+        red_index, red_cost, red_valid = _best_lane_orders(red_index, lane_orders, eligible, cost)
         
-        if mmr_diff < best_mmr_diff:
-            best_mmr_diff = mmr_diff
-            best_blue = blue_team.copy()
-            best_red = red_team.copy()
+        lane_diff = np.abs(mmr[blue_index] - mmr[red_index]).sum(axis=1)
+        discomfort = blue_cost + red_cost
+        valid = blue_valid & red_valid
     
-    return best_blue, best_red, None if best_blue else "팀 밸런싱에 실패했습니다."
+    return [(int(mmr_diff[i]), int(lane_diff[i]), int(discomfort[i]), int(masks[i]),
+             [players[j] for j in blue_index[i]], [players[j] for j in red_index[i]])
+            for i in np.flatnonzero(valid)]
 
 
-def balance_teams_option2(players: List[str], dm) -> Tuple[Optional[List[str]], Optional[List[str]], Optional[str]]:
-    """Option 2: Win rate adjusted MMR only (ignore positions)."""
+def balance_teams_option2(snapshot: RatingSnapshot) -> Tuple[Optional[List[str]], Optional[List[str]], Optional[str]]:
+    """Option 2: Win rate adjusted MMR only (ignore positions) - exact minimum difference."""
+    players = snapshot.players
     if len(players) != 10:
         return None, None, "정확히 10명의 플레이어가 필요합니다."
     
-    # Calculate adjusted MMR for all players
-    player_mmrs = [(player, calculate_adjusted_mmr(player, dm)) for player in players]
-    player_mmrs.sort(key=lambda x: x[1], reverse=True)  # Sort by MMR descending
+    # Rank all 126 splits by adjusted MMR difference
+    _, _, best_blue, best_red = rank_splits(snapshot, "adjusted")[0]
+    return best_blue, best_red, None
+
+
+def split_distance(mask_a: int, mask_b: int, count: int) -> int:
+    """
+    Hamming distance between two splits, ignoring which side is blue.
     
-    best_blue = None
-    best_red = None
-    best_mmr_diff = float('inf')
+    min(popcount(a ^ b), popcount(a ^ ~b)) - one player swapped between
+    the teams moves two players, so distance 2.
+    """
+    moved = ((mask_a ^ mask_b) & ((1 << count) - 1)).bit_count()
+    return min(moved, count - moved)
+
+
+def mask_from_team(players: List[str], team: List[str]) -> int:
+    """Bitmask of a team over the player list."""
+    members = set(team)
+    return sum(1 << i for i, player in enumerate(players) if player in members)
+
+
+def k_best_diverse_splits(ranked: List[Tuple], count: int, k: int, min_distance: int,
+                          avoid_masks: List[int] = ()) -> List[Tuple]:
+    """
+    Pick the k best splits that are all at least min_distance apart.
     
-    # Try different combinations focusing on MMR balance
-    for _ in range(2000):
-        shuffled_players = [p[0] for p in player_mmrs]
-        random.shuffle(shuffled_players)
-        
-        blue_team = shuffled_players[:5]
-        red_team = shuffled_players[5:]
-        
-        blue_mmr = calculate_team_mmr_adjusted(blue_team, dm, "adjusted")
-        red_mmr = calculate_team_mmr_adjusted(red_team, dm, "adjusted")
-        mmr_diff = abs(blue_mmr - red_mmr)
-        
-        if mmr_diff < best_mmr_diff:
-            best_mmr_diff = mmr_diff
-            best_blue = blue_team.copy()
-            best_red = red_team.copy()
+    One pass over the ranked splits: a split is taken when it is far
+    enough from every split taken so far and from avoid_masks.
     
-    return best_blue, best_red, None
+    Args:
+        ranked: Splits from rank_splits, best first
+        count: Number of players
+        k: Number of splits wanted
+        min_distance: Minimum split_distance between any two results
+        avoid_masks: Splits the results must also keep their distance from
+    
+    Returns:
+        Up to k entries of ranked, best first
+    """
+    taken_masks = list(avoid_masks)
+    chosen = []
+    for entry in ranked:
+        mask = entry[1]
+        if all(split_distance(mask, other, count) >= min_distance for other in taken_masks):
+            chosen.append(entry)
+            taken_masks.append(mask)
+            if len(chosen) == k:
+                break
+    return chosen
 
 
-def balance_teams_option3(players: List[str], dm, option1_teams: Tuple, option2_teams: Tuple) -> Tuple[Optional[List[str]], Optional[List[str]], Optional[str]]:
-    """Option 3: Alternative team composition for variety (different from options 1&2)."""
+def balance_teams_option3(snapshot: RatingSnapshot, avoid_teams: List[Optional[List[str]]], count: int = 1,
+                          min_distance: int = 4) -> Tuple[List[Tuple[List[str], List[str]]], Optional[str]]:
+    """
+    Option 3: Alternative team compositions for variety (different from options 1&2).
+    
+    Returns the `count` most balanced splits (adjusted MMR) that differ from
+    avoid_teams and from each other by at least `min_distance` (see
+    split_distance; 4 = at least two players swapped).
+    
+    Args:
+        snapshot: Ratings of the ten players
+        avoid_teams: Blue teams of the earlier options (None entries skipped),
+            see option3_avoid_teams
+        count: Number of alternatives
+        min_distance: Minimum split_distance between any two splits
+    
+    Returns:
+        Tuple: ([(blue_team, red_team), ...], error message or None)
+    """
+    players = snapshot.players
     if len(players) != 10:
-        return None, None, "정확히 10명의 플레이어가 필요합니다."
+        return [], "정확히 10명의 플레이어가 필요합니다."
     
-    # Get teams from previous options to avoid
-    avoid_teams = set()
-    if option1_teams[0] and option1_teams[1]:
-        avoid_teams.add(tuple(sorted(option1_teams[0])))
-        avoid_teams.add(tuple(sorted(option1_teams[1])))
-    if option2_teams[0] and option2_teams[1]:
-        avoid_teams.add(tuple(sorted(option2_teams[0])))
-        avoid_teams.add(tuple(sorted(option2_teams[1])))
+    avoid_masks = [mask_from_team(players, blue_team) for blue_team in avoid_teams if blue_team]
     
-    best_blue = None
-    best_red = None
-    best_mmr_diff = float('inf')
+    ranked = rank_splits(snapshot, "adjusted")
+    chosen = k_best_diverse_splits(ranked, len(players), count, min_distance, avoid_masks)
+    if not chosen:
+        return [], "새로운 팀 구성을 찾지 못했습니다."
+    return [(blue_team, red_team) for _, _, blue_team, red_team in chosen], None
+
+
+def option3_avoid_teams(option1: Tuple, option2: Tuple) -> List[Optional[List[str]]]:
+    """Blue teams of options 1 (fair and comfortable) and 2, for option 3 to avoid."""
+    avoid_teams = [option1[0], option2[0]]
+    if option1[3]:
+        avoid_teams.append(option1[3][0])
+    return avoid_teams
+
+
+def split_win_logits(snapshot: RatingSnapshot, mmr_type: str = "adjusted") -> List[Tuple[float, int]]:
+    """
+    Blue-side win log-odds (RatingSnapshot.win_probability) of every split.
     
-    # Use base adjusted MMR (not recent form) for consistency
-    for _ in range(2000):
-        shuffled_players = players.copy()
-        random.shuffle(shuffled_players)
-        
-        blue_team = shuffled_players[:5]
-        red_team = shuffled_players[5:]
-        
-        # Skip if this team composition matches previous options
-        if (tuple(sorted(blue_team)) in avoid_teams or 
-            tuple(sorted(red_team)) in avoid_teams):
-            continue
-        
-        # Use same MMR calculation as option 2 for fair comparison
-        blue_mmr = calculate_team_mmr_adjusted(blue_team, dm, "adjusted")
-        red_mmr = calculate_team_mmr_adjusted(red_team, dm, "adjusted")
-        mmr_diff = abs(blue_mmr - red_mmr)
-        
-        if mmr_diff < best_mmr_diff:
-            best_mmr_diff = mmr_diff
-            best_blue = blue_team.copy()
-            best_red = red_team.copy()
+    NumPy scores all splits at once: pair sums are members @ synergy
+    matrix products. The pure-Python path gives the same result.
+    
+    Returns:
+        List of (log-odds, blue_mask) in no particular order
+    """
+    players = snapshot.players
+    team_size = len(players) // 2
+    pair_count = team_size * (team_size - 1) / 2
+    mmr_factor = math.log(10) / settings.WIN_PROBABILITY_SCALE / team_size
+    
+    if np is not None:
+        masks, members, _, _, _ = _split_tables(len(players))
+        mmr = np.array(snapshot.mmrs(players, mmr_type), dtype=np.float64)
+        synergy = np.array(snapshot.synergy, dtype=np.float64)
+        blue = members.astype(np.float64)
+        red = 1.0 - blue
+        mmr_edge = blue @ mmr - red @ mmr
+        pair_edge = (((blue @ synergy) * blue).sum(axis=1) - ((red @ synergy) * red).sum(axis=1)) / 2
+        logits = mmr_edge * mmr_factor + settings.SYNERGY_WEIGHT * pair_edge / pair_count
+        return [(float(logit), int(mask)) for logit, mask in zip(logits, masks)]
+    
+    logits = []
+    for _, blue_mask in rank_team_splits(players, snapshot.mmrs(players, mmr_type)):
+        blue_team, red_team = split_from_mask(players, blue_mask)
+        probability = snapshot.win_probability(blue_team, red_team, mmr_type)
+        logits.append((math.log(probability / (1 - probability)), blue_mask))
+    return logits
+
+
+def balance_teams_option4(snapshot: RatingSnapshot) -> Tuple[Optional[List[str]], Optional[List[str]], Optional[str],
+                                                            Optional[float]]:
+    """
+    Option 4: Predicted win probability closest to 50%, including teammate synergy.
+    
+    Returns:
+        Tuple: (blue_team, red_team, error message, blue win probability)
+    """
+    players = snapshot.players
+    if len(players) != 10:
+        return None, None, "정확히 10명의 플레이어가 필요합니다.", None
     
-    return best_blue, best_red, None if best_blue else "새로운 팀 구성을 찾지 못했습니다."
+    _, blue_mask = min(split_win_logits(snapshot), key=lambda x: (round(abs(x[0]), 9), x[1]))
+    blue_team, red_team = split_from_mask(players, blue_mask)
+    return blue_team, red_team, None, snapshot.win_probability(blue_team, red_team)
 
 
 def create_team_embed(option_num: int, option_name: str, blue_team: List[str], red_team: List[str], 
-                     dm, mmr_type: str = "base", color: discord.Color = discord.Color.blue(), 
+                     snapshot: RatingSnapshot, mmr_type: str = "base", color: discord.Color = discord.Color.blue(), 
                      show_positions: bool = True) -> discord.Embed:
     """Create embed for team composition."""
     embed = discord.Embed(
@@ -332,13 +787,7 @@ def create_team_embed(option_num: int, option_name: str, blue_team: List[str], r
     # Blue team info
     blue_info = []
     for i, player in enumerate(blue_team):
-        user_data = dm.get_user(player)
-        if mmr_type == "adjusted":
-            mmr = calculate_adjusted_mmr(player, dm)
-        elif mmr_type == "recent":
-            mmr = calculate_recent_form_mmr(player, dm)
-        else:
-            mmr = user_data['mmr'] if user_data else 1000
+        mmr = snapshot.mmr(player, mmr_type)
         
         if show_positions and len(blue_team) == 5 and i < 5:  # Position-based team
             blue_info.append(f"{positions[i]}: **{player}** (MMR: {mmr})")
@@ -354,13 +803,7 @@ def create_team_embed(option_num: int, option_name: str, blue_team: List[str], r
     # Red team info
     red_info = []
     for i, player in enumerate(red_team):
-        user_data = dm.get_user(player)
-        if mmr_type == "adjusted":
-            mmr = calculate_adjusted_mmr(player, dm)
-        elif mmr_type == "recent":
-            mmr = calculate_recent_form_mmr(player, dm)
-        else:
-            mmr = user_data['mmr'] if user_data else 1000
+        mmr = snapshot.mmr(player, mmr_type)
         
         if show_positions and len(red_team) == 5 and i < 5:  # Position-based team
             red_info.append(f"{positions[i]}: **{player}** (MMR: {mmr})")
@@ -374,8 +817,8 @@ def create_team_embed(option_num: int, option_name: str, blue_team: List[str], r
     )
     
     # Team statistics
-    blue_mmr = calculate_team_mmr_adjusted(blue_team, dm, mmr_type)
-    red_mmr = calculate_team_mmr_adjusted(red_team, dm, mmr_type)
+    blue_mmr = snapshot.team_mmr(blue_team, mmr_type)
+    red_mmr = snapshot.team_mmr(red_team, mmr_type)
     mmr_diff = abs(blue_mmr - red_mmr)
     
     embed.add_field(
@@ -404,17 +847,263 @@ def create_team_embed(option_num: int, option_name: str, blue_team: List[str], r
         inline=True
     )
     
+    # Lane matchups and position comfort (lane-ordered teams only)
+    if show_positions and len(blue_team) == 5 and len(red_team) == 5:
+        placements = [snapshot.placement_cost(player, position)
+                      for team in (blue_team, red_team)
+                      for player, position in zip(team, positions)]
+        lane_diffs = [abs(snapshot.mmr(blue, mmr_type) - snapshot.mmr(red, mmr_type))
+                      for blue, red in zip(blue_team, red_team)]
+        worst_lane = max(range(5), key=lambda i: lane_diffs[i])
+        
+        embed.add_field(
+            name="🎯 포지션 만족도",
+            value=(f"주포지션 {placements.count(0)}명 · 부포지션 {placements.count(1)}명 · "
+                   f"기타 {placements.count(2)}명\n"
+                   f"라인 상대 MMR 차이 합: {sum(lane_diffs)} "
+                   f"(최대 {positions[worst_lane]} {lane_diffs[worst_lane]})"),
+            inline=False
+        )
+    
     return embed
 
 
+def build_team_option_embeds(snapshot: RatingSnapshot, option1_teams: Tuple, option2_teams: Tuple,
+                             option3_results: Tuple, option4_teams: Tuple) -> List[discord.Embed]:
+    """Build the embeds for the four balancing options."""
+    embeds = []
+    
+    # Create embeds for each successful option
+    if option1_teams[0] and option1_teams[1]:
+        comfortable = option1_teams[3]
+        name = "레이팅 기반 포지션+MMR 고려" + (" (공정 우선)" if comfortable else "")
+        embed1 = create_team_embed(
+            1, name, 
+            option1_teams[0], option1_teams[1], 
+            snapshot, "adjusted", discord.Color.blue(), 
+            show_positions=True
+        )
+        embeds.append(embed1)
+        
+        if comfortable:
+            embed1_comfort = create_team_embed(
+                1, "레이팅 기반 포지션+MMR 고려 (포지션 만족 우선)", 
+                comfortable[0], comfortable[1], 
+                snapshot, "adjusted", discord.Color.teal(), 
+                show_positions=True
+            )
+            embeds.append(embed1_comfort)
+    elif option1_teams[2]:  # Error message
+        error_embed = discord.Embed(
+            title="❌ 옵션 1: 레이팅 기반 포지션+MMR 고려 실패",
+            description=option1_teams[2],
+            color=discord.Color.red()
+        )
+        embeds.append(error_embed)
+    
+    if option2_teams[0] and option2_teams[1]:
+        embed2 = create_team_embed(
+            2, "레이팅 기반 MMR만 고려", 
+            option2_teams[0], option2_teams[1], 
+            snapshot, "adjusted", discord.Color.green(),
+            show_positions=False
+        )
+        embeds.append(embed2)
+    
+    alternatives, _ = option3_results
+    for i, (blue_team, red_team) in enumerate(alternatives):
+        name = "다양성을 위한 대안 구성" if len(alternatives) == 1 else f"다양성을 위한 대안 구성 {i + 1}"
+        embed3 = create_team_embed(
+            3, name, 
+            blue_team, red_team, 
+            snapshot, "adjusted", discord.Color.purple(),
+            show_positions=False
+        )
+        embeds.append(embed3)
+    
+    if option4_teams[0] and option4_teams[1]:
+        embed4 = create_team_embed(
+            4, "시너지 포함 승률 예측 기반", 
+            option4_teams[0], option4_teams[1], 
+            snapshot, "adjusted", discord.Color.orange(),
+            show_positions=False
+        )
+        blue_probability = option4_teams[3]
+        embed4.add_field(
+            name="🎲 예상 승률",
+            value=f"🔵 블루팀 {blue_probability * 100:.1f}% : 🔴 레드팀 {(1 - blue_probability) * 100:.1f}%",
+            inline=False
+        )
+        embeds.append(embed4)
+    
+    return embeds
+
+
+def create_multi_team_embed(teams: List[List[str]], snapshot: RatingSnapshot,
+                            mmr_type: str = "adjusted", warning: Optional[str] = None) -> discord.Embed:
+    """Create embed for a 3+ team lobby, or any lobby whose teams aren't five."""
+    embed = discord.Embed(
+        title=f"⚔️ {len(teams)}팀 구성",
+        description=warning,
+        color=discord.Color.blue()
+    )
+    
+    team_mmrs = [snapshot.team_mmr(team, mmr_type) for team in teams]
+    for number, (team, team_mmr) in enumerate(zip(teams, team_mmrs), 1):
+        # Teams of five come back in lane order; other sizes ignore positions
+        lines = [(f"{POSITIONS[i]}: " if len(team) == len(POSITIONS) else "") +
+                 f"**{player}** (MMR: {snapshot.mmr(player, mmr_type)})"
+                 for i, player in enumerate(team)]
+        embed.add_field(
+            name=f"🛡️ {number}팀 (MMR: {team_mmr})",
+            value="\n".join(lines),
+            inline=True
+        )
+    
+    spread = max(team_mmrs) - min(team_mmrs)
+    embed.add_field(
+        name="📊 팀 통계",
+        value=f"⚖️ 최고-최저 팀 MMR 차이: {spread}",
+        inline=False
+    )
+    
+    return embed
+
+
+def balance_teams_multi(snapshot: RatingSnapshot, team_count: int,
+                        team_size: int = 5) -> Tuple[Optional[List[List[str]]], Optional[str]]:
+    """
+    Split the snapshot's players into team_count teams of team_size
+    (adjusted MMR; positions only count for teams of five).
+    """
+    position_map = snapshot.position_map if team_size == len(POSITIONS) else None
+    return balance_multi_teams(snapshot.players, snapshot.adjusted, team_count, team_size,
+                               position_map=position_map)
+
+
+# ===== BALANCING POOL =====
+
+_balance_executor: Optional[Executor] = None
+
+
+def get_balance_executor() -> Executor:
+    """Pool the balancers run in (settings.BALANCE_EXECUTOR), created on first use."""
+    global _balance_executor
+    if _balance_executor is None:
+        if settings.BALANCE_EXECUTOR == "process":
+            # Forking would copy the bot's running threads and timers mid-state
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _balance_executor = ProcessPoolExecutor(max_workers=settings.BALANCE_WORKERS, mp_context=context)
+        else:
+            _balance_executor = ThreadPoolExecutor(max_workers=settings.BALANCE_WORKERS,
+                                                   thread_name_prefix="balance")
+    return _balance_executor
+
+
+def shutdown_balance_executor():
+    """Stop the balancing pool, dropping queued work (restarted on next use)."""
+    global _balance_executor
+    if _balance_executor is not None:
+        _balance_executor.shutdown(wait=False, cancel_futures=True)
+        _balance_executor = None
+
+
+async def run_balancers(snapshot: RatingSnapshot, alternatives: int = 1, min_distance: int = 4,
+                        timeout: Optional[float] = None) -> List[Tuple]:
+    """
+    Run the four balancing options in parallel in the balancing pool.
+    
+    Options 1, 2 and 4 start together; option 3 starts as soon as options
+    1 and 2 are done, since it must avoid their splits. alternatives/
+    min_distance are passed to option 3.
+    
+    The balancers only read the snapshot, so they never touch the data
+    executor. If the timeout expires or the calling command is cancelled,
+    the pending jobs are cancelled; a job already running finishes in the
+    background (every solver has a worst-case bound).
+    
+    Raises:
+        asyncio.TimeoutError: Balancing took longer than the timeout
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_balance_executor()
+    timeout = settings.BALANCE_TIMEOUT if timeout is None else timeout
+    
+    jobs = [loop.run_in_executor(executor, balancer, snapshot)
+            for balancer in (balance_teams_option1, balance_teams_option2, balance_teams_option4)]
+    
+    async def run_all():
+        option1, option2 = await asyncio.gather(jobs[0], jobs[1])
+        option3 = functools.partial(balance_teams_option3, avoid_teams=option3_avoid_teams(option1, option2),
+                                    count=alternatives, min_distance=min_distance)
+        jobs.append(loop.run_in_executor(executor, option3, snapshot))
+        return [option1, option2, await jobs[3], await jobs[2]]
+    
+    try:
+        return await asyncio.wait_for(run_all(), timeout)
+    finally:
+        for job in jobs:
+            job.cancel()
+
+
+async def run_multi_balancer(snapshot: RatingSnapshot, team_count: int, team_size: int = 5,
+                             timeout: Optional[float] = None) -> Tuple[Optional[List[List[str]]], Optional[str]]:
+    """
+    Run the multi-team balancer in the balancing pool.
+    
+    Raises:
+        asyncio.TimeoutError: Balancing took longer than the timeout
+    """
+    loop = asyncio.get_running_loop()
+    timeout = settings.BALANCE_TIMEOUT if timeout is None else timeout
+    job = loop.run_in_executor(get_balance_executor(), balance_teams_multi, snapshot, team_count, team_size)
+    try:
+        return await asyncio.wait_for(job, timeout)
+    finally:
+        job.cancel()
+
+
+# ===== RESULT CACHE =====
+
+# (guild, sorted players, option, generation) -> (snapshot, balancer results)
+_result_cache: "OrderedDict[Tuple, Tuple[RatingSnapshot, Any]]" = OrderedDict()
+
+
+def balance_cache_key(guild_id: Optional[int], players: List[str], option: Tuple, generation: int) -> Tuple:
+    """
+    Cache key for a balancing result.
+    
+    The data generation changes on every recorded match or player edit,
+    so entries from before a change are simply never looked up again.
+    """
+    return guild_id, tuple(sorted(players)), option, generation
+
+
+def get_cached_balance(key: Tuple) -> Optional[Tuple[RatingSnapshot, Any]]:
+    """Look up a cached (snapshot, results) pair, marking it recently used."""
+    entry = _result_cache.get(key)
+    if entry is not None:
+        _result_cache.move_to_end(key)
+    return entry
+
+
+def cache_balance(key: Tuple, snapshot: RatingSnapshot, results: Any):
+    """Store a (snapshot, results) pair, evicting the least recently used."""
+    _result_cache[key] = (snapshot, results)
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > settings.BALANCE_CACHE_SIZE:
+        _result_cache.popitem(last=False)
+
+
 # Create autocomplete function for player names
 async def player_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     """Autocomplete function for player names."""
     try:
-        dm = get_data_manager()
-        all_users = dm.get_all_users()
+        adm = get_async_data_manager(interaction.guild_id)
+        user_names = await adm.get_user_names()
         
-        filtered_users = [name for name in all_users.keys() if current.lower() in name.lower()]
+        filtered_users = [name for name in user_names if current.lower() in name.lower()]
         
         return [
             app_commands.Choice(name=user, value=user)
@@ -424,7 +1113,7 @@ async def player_autocomplete(interaction: discord.Interaction, current: str) ->
         return []
 
 
-@app_commands.command(name='팀구성', description='10명의 플레이어로 3가지 밸런싱 옵션의 팀을 구성합니다')
+@app_commands.command(name='팀구성', description='10~20명의 플레이어로 팀을 구성합니다 (남는 인원은 공정하게 대기)')
 @app_commands.describe(
     플레이어1='첫 번째 플레이어',
     플레이어2='두 번째 플레이어',
@@ -435,7 +1124,21 @@ async def player_autocomplete(interaction: discord.Interaction, current: str) ->
     플레이어7='일곱 번째 플레이어',
     플레이어8='여덟 번째 플레이어',
     플레이어9='아홉 번째 플레이어',
-    플레이어10='열 번째 플레이어'
+    플레이어10='열 번째 플레이어',
+    플레이어11='11번째 플레이어 (선택)',
+    플레이어12='12번째 플레이어 (선택)',
+    플레이어13='13번째 플레이어 (선택)',
+    플레이어14='14번째 플레이어 (선택)',
+    플레이어15='15번째 플레이어 (선택)',
+    플레이어16='16번째 플레이어 (선택)',
+    플레이어17='17번째 플레이어 (선택)',
+    플레이어18='18번째 플레이어 (선택)',
+    플레이어19='19번째 플레이어 (선택)',
+    플레이어20='20번째 플레이어 (선택)',
+    팀수='만들 팀 수 (기본 2, 3 이상이면 팀 여러 개)',
+    팀크기='팀당 인원 (기본 5, 5명이 아니면 포지션 무시)',
+    대안수='옵션 3으로 보여줄 대안 구성 수 (기본 1)',
+    최소거리='대안 구성끼리 팀이 바뀌어야 하는 최소 인원 (2 = 1명 교체, 4 = 2명 교체, 기본 4)'
 )
 @app_commands.autocomplete(플레이어1=player_autocomplete)
 @app_commands.autocomplete(플레이어2=player_autocomplete)
@@ -447,6 +1150,16 @@ async def player_autocomplete(interaction: discord.Interaction, current: str) ->
 @app_commands.autocomplete(플레이어8=player_autocomplete)
 @app_commands.autocomplete(플레이어9=player_autocomplete)
 @app_commands.autocomplete(플레이어10=player_autocomplete)
+@app_commands.autocomplete(플레이어11=player_autocomplete)
+@app_commands.autocomplete(플레이어12=player_autocomplete)
+@app_commands.autocomplete(플레이어13=player_autocomplete)
+@app_commands.autocomplete(플레이어14=player_autocomplete)
+@app_commands.autocomplete(플레이어15=player_autocomplete)
+@app_commands.autocomplete(플레이어16=player_autocomplete)
+@app_commands.autocomplete(플레이어17=player_autocomplete)
+@app_commands.autocomplete(플레이어18=player_autocomplete)
+@app_commands.autocomplete(플레이어19=player_autocomplete)
+@app_commands.autocomplete(플레이어20=player_autocomplete)
 async def team_formation_command(
     interaction: discord.Interaction,
     플레이어1: str,
@@ -458,25 +1171,51 @@ async def team_formation_command(
     플레이어7: str,
     플레이어8: str,
     플레이어9: str,
-    플레이어10: str
+    플레이어10: str,
+    플레이어11: Optional[str] = None,
+    플레이어12: Optional[str] = None,
+    플레이어13: Optional[str] = None,
+    플레이어14: Optional[str] = None,
+    플레이어15: Optional[str] = None,
+    플레이어16: Optional[str] = None,
+    플레이어17: Optional[str] = None,
+    플레이어18: Optional[str] = None,
+    플레이어19: Optional[str] = None,
+    플레이어20: Optional[str] = None,
+    팀수: app_commands.Range[int, 2, 4] = 2,
+    팀크기: app_commands.Range[int, 3, 5] = 5,
+    대안수: app_commands.Range[int, 1, 5] = 1,
+    최소거리: app_commands.Range[int, 2, 4] = 4
 ):
     """
-    Create balanced teams from 10 selected players with 3 different balancing options.
+    Create balanced teams from 10-20 selected players.
+    
+    Players beyond 팀수 x 팀크기 sit out (most games today first). Two teams
+    of five get the 4 balancing options; other lobbies get one multi-team
+    split, ignoring positions unless teams are five.
     
     Parameters:
-    - 플레이어1~10: Names of 10 players to form teams
+    - 플레이어1~10: Names of players to form teams
+    - 플레이어11~20: Optional extra signups
+    - 팀수: Number of teams
+    - 팀크기: Players per team (positions only count for 5)
+    - 대안수: Number of option 3 alternatives
+    - 최소거리: Minimum split distance between alternatives (and options 1&2)
     """
     logger = interaction.client.logger
     logger.info(f"🎯 ENHANCED TEAM FORMATION COMMAND STARTED by {interaction.user} ({interaction.user.id})")
     
     players = [플레이어1, 플레이어2, 플레이어3, 플레이어4, 플레이어5, 
-              플레이어6, 플레이어7, 플레이어8, 플레이어9, 플레이어10]
+              플레이어6, 플레이어7, 플레이어8, 플레이어9, 플레이어10,
+              플레이어11, 플레이어12, 플레이어13, 플레이어14, 플레이어15,
+              플레이어16, 플레이어17, 플레이어18, 플레이어19, 플레이어20]
+    players = [player for player in players if player]
     
     logger.debug(f"Selected players: {players}")
     
     try:
         # Get data manager
-        dm = get_data_manager()
+        adm = get_async_data_manager(interaction.guild_id)
         
         # Validate all players exist and remove duplicates
         unique_players = []
@@ -487,7 +1226,7 @@ async def team_formation_command(
             if player in seen:
                 continue
             
-            if not dm.user_exists(player):
+            if not await adm.user_exists(player):
                 invalid_players.append(player)
             else:
                 unique_players.append(player)
@@ -502,11 +1241,14 @@ async def team_formation_command(
             )
             return
         
-        # Check if exactly 10 unique players
-        if len(unique_players) != 10:
-            logger.warning(f"Invalid player count: {len(unique_players)} (need 10)")
+        # Check there are enough unique players for the requested teams
+        needed = 팀수 * 팀크기
+        # The four options (and /경기결과) need a standard 5v5
+        options_mode = 팀수 == 2 and 팀크기 == len(POSITIONS)
+        if len(unique_players) < needed:
+            logger.warning(f"Invalid player count: {len(unique_players)} (need {needed})")
             await interaction.response.send_message(
-                f"❌ 정확히 10명의 서로 다른 플레이어를 선택해야 합니다. (현재: {len(unique_players)}명)", 
+                f"❌ {팀수}팀을 만들려면 {needed}명 이상의 서로 다른 플레이어를 선택해야 합니다. (현재: {len(unique_players)}명)", 
                 ephemeral=True
             )
             return
@@ -514,66 +1256,83 @@ async def team_formation_command(
         # Defer response for longer processing time
         await interaction.response.defer()
         
-        logger.debug("Starting team balancing with 3 options")
+        # Bench the surplus: most games today sit out first
+        bench = []
+        if len(unique_players) > needed:
+            games_today, last_played = await adm.run(get_play_history, adm.dm)
+            unique_players, bench = choose_bench(unique_players, len(unique_players) - needed,
+                                                 games_today, last_played)
+            logger.debug(f"Benched players: {bench}")
         
-        # Generate 3 different team compositions
-        option1_teams = balance_teams_option1(unique_players, dm)
-        option2_teams = balance_teams_option2(unique_players, dm)
-        option3_teams = balance_teams_option3(unique_players, dm, option1_teams, option2_teams)
+        logger.debug(f"Starting team balancing for {팀수} teams of {팀크기}")
         
-        embeds = []
+        # Same players, options and data as a recent run: reuse its result
+        option = ("options", 대안수, 최소거리) if options_mode else ("multi", 팀수, 팀크기)
+        cache_key = balance_cache_key(interaction.guild_id, unique_players, option,
+                                      await adm.get_generation())
+        cached = get_cached_balance(cache_key)
         
-        # Create embeds for each successful option
-        if option1_teams[0] and option1_teams[1]:
-            embed1 = create_team_embed(
-                1, "승률기반 포지션+MMR 고려", 
-                option1_teams[0], option1_teams[1], 
-                dm, "adjusted", discord.Color.blue(), 
-                show_positions=True
-            )
-            embeds.append(embed1)
-        elif option1_teams[2]:  # Error message
-            error_embed = discord.Embed(
-                title="❌ 옵션 1: 승률기반 포지션+MMR 고려 실패",
-                description=option1_teams[2],
-                color=discord.Color.red()
-            )
-            embeds.append(error_embed)
-        
-        if option2_teams[0] and option2_teams[1]:
-            embed2 = create_team_embed(
-                2, "승률기반 MMR만 고려", 
-                option2_teams[0], option2_teams[1], 
-                dm, "adjusted", discord.Color.green(),
-                show_positions=False
-            )
-            embeds.append(embed2)
+        if cached:
+            logger.debug("Using cached team balancing result")
+            snapshot, results = cached
+        else:
+            # Read ratings on the data executor, then balance in the balancing pool
+            snapshot = await adm.run(RatingSnapshot, unique_players, adm.dm)
+            try:
+                if options_mode:
+                    results = await run_balancers(snapshot, 대안수, 최소거리)
+                else:
+                    results = await run_multi_balancer(snapshot, 팀수, 팀크기)
+            except asyncio.TimeoutError:
+                logger.warning(f"⏱️ Team balancing timed out after {settings.BALANCE_TIMEOUT}s")
+                await interaction.followup.send("❌ 팀 구성 계산 시간이 초과되었습니다. 잠시 후 다시 시도해주세요.", ephemeral=True)
+                return
+            cache_balance(cache_key, snapshot, results)
         
-        if option3_teams[0] and option3_teams[1]:
-            embed3 = create_team_embed(
-                3, "다양성을 위한 대안 구성", 
-                option3_teams[0], option3_teams[1], 
-                dm, "adjusted", discord.Color.purple(),
-                show_positions=False
-            )
-            embeds.append(embed3)
+        if options_mode:
+            embeds = build_team_option_embeds(snapshot, *results)
+        else:
+            multi_teams, multi_warning = results
+            embeds = [create_multi_team_embed(multi_teams, snapshot, "adjusted", multi_warning)] if multi_teams else []
         
         if not embeds:
             await interaction.followup.send("❌ 모든 팀 구성 옵션에서 균형잡힌 팀을 만들 수 없습니다.", ephemeral=True)
             return
         
         # Create main embed with explanation
-        main_embed = discord.Embed(
-            title="🎯 다중 옵션 팀 구성 결과",
-            description=(
-                "**3가지 밸런싱 방식으로 팀을 구성했습니다:**\n\n"
-                "🔵 **옵션 1**: 승률을 반영한 MMR + 포지션 고려\n"
-                "🟢 **옵션 2**: 승률을 반영한 MMR만 고려 (포지션 무시)\n"
-                "🟣 **옵션 3**: 다양성을 위한 대안 구성 (위 옵션들과 다른 조합)\n\n"
-                "각 옵션은 승률 50% 근접을 목표로 합니다."
-            ),
-            color=discord.Color.gold()
-        )
+        if options_mode:
+            main_embed = discord.Embed(
+                title="🎯 다중 옵션 팀 구성 결과",
+                description=(
+                    "**4가지 밸런싱 방식으로 팀을 구성했습니다:**\n\n"
+                    "🔵 **옵션 1**: 레이팅(경기 결과로 갱신되는 MMR) + 포지션 고려 (공정 우선 / 포지션 만족 우선)\n"
+                    "🟢 **옵션 2**: 레이팅만 고려 (포지션 무시)\n"
+                    "🟣 **옵션 3**: 다양성을 위한 대안 구성 (위 옵션들과 다른 조합)\n"
+                    "🟠 **옵션 4**: 레이팅 + 팀원 시너지로 예측한 승률 50% 기준\n\n"
+                    "각 옵션은 승률 50% 근접을 목표로 합니다."
+                ),
+                color=discord.Color.gold()
+            )
+        else:
+            if 팀크기 == len(POSITIONS):
+                method = "레이팅 + 포지션을 고려해 팀 간 레이팅 차이를 최소화합니다."
+            else:
+                method = "레이팅으로 팀 간 레이팅 차이를 최소화합니다. (팀당 5명이 아니므로 포지션은 고려하지 않습니다)"
+            main_embed = discord.Embed(
+                title=f"🎯 {팀수}팀 구성 결과 ({팀크기}명씩)",
+                description=(
+                    f"**{len(unique_players)}명을 {팀수}팀으로 나눴습니다.**\n\n"
+                    f"{method}"
+                ),
+                color=discord.Color.gold()
+            )
+        
+        if bench:
+            main_embed.add_field(
+                name="🪑 대기 인원",
+                value=f"{', '.join(bench)}\n*(오늘 경기 수가 많은 순, 같으면 최근에 뛴 순)*",
+                inline=False
+            )
         main_embed.set_footer(text=f"팀 구성자: {interaction.user.display_name}")
         
         # Send main embed first, then individual option embeds
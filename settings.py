@@ -34,6 +34,84 @@ CONSOLE_LOGGING = True
 # Enable file logging
 FILE_LOGGING = True
 
+# Data storage backend ("json" or "sqlite")
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json')
+
+# SQLite database file name inside the data directory (sqlite backend only).
+# On first start the existing users.json/matches.json are migrated into it.
+SQLITE_DB_FILENAME = 'bot.db'
+
+# Number of journaled commits before they are compacted into
+# users.json/matches.json (json backend only)
+JOURNAL_COMPACT_THRESHOLD = 200
+
+# Snapshot format for the json backend: "json" (users.json/matches.json) or
+# "binary" (compact data/snapshot.bin, converted from the JSON files on first
+# start). Run binary_snapshot.snapshot_to_json(data_dir) before switching back to "json".
+SNAPSHOT_FORMAT = os.getenv('SNAPSHOT_FORMAT', 'json')
+
+# How many times a write is re-run on fresh data after losing a race against
+# another process or store writing the same data files
+COMMIT_RETRIES = 3
+
+# Write-behind: keep changes in memory and flush them to storage after this
+# many seconds (0 disables write-behind - every change is written immediately).
+# Acknowledged changes can't be re-run, so a flush that races another writer
+# merges field by field instead: changed fields overwrite, win/loss counters
+# add up, and two writers setting the same field keep the later flush.
+WRITE_BEHIND_DELAY = float(os.getenv('WRITE_BEHIND_DELAY', '0'))
+
+# Flush write-behind changes early once this many users/matches are dirty
+WRITE_BEHIND_MAX_DIRTY = 50
+
+# Per-guild data: when enabled every guild gets its own data/guilds/<guild_id>/
+# directory. The guild in LEGACY_GUILD_ID keeps using data/ itself, so set it
+# to the server that owns the existing data before enabling sharding.
+GUILD_DATA_SHARDING = os.getenv('GUILD_DATA_SHARDING', 'false').lower() == 'true'
+LEGACY_GUILD_ID = int(os.getenv('LEGACY_GUILD_ID', '0')) or None
+
+# Keep at most this many guild stores loaded (least recently used are unloaded)
+MAX_LOADED_GUILDS = 20
+
+# Unload a guild store after this many seconds without use
+GUILD_IDLE_TIMEOUT = 1800
+
+# Team balancing runs outside the event loop in this pool: "thread" (default)
+# or "process" (real parallelism; workers are started fresh, never forked
+# from the running bot)
+BALANCE_EXECUTOR = os.getenv('BALANCE_EXECUTOR', 'thread')
+BALANCE_WORKERS = 3
+
+# Give up on a /팀구성 calculation after this many seconds
+BALANCE_TIMEOUT = 10
+
+# Option 1 objective weights: (team MMR diff, sum of per-lane MMR diffs,
+# placement discomfort: 0 main / 1 sub / 2 other lane per player).
+# "Most fair" and "most comfortable" are the Pareto-optimal splits with the
+# lowest weighted score under each set; ties go to the lower team diff,
+# then lane diff, then discomfort. "Most fair" keeps the smallest team MMR
+# difference, with lane diff only breaking ties.
+BALANCE_FAIR_WEIGHTS = (1.0, 0.0, 0.0)
+BALANCE_COMFORT_WEIGHTS = (0.1, 0.01, 100.0)
+
+# Remember this many /팀구성 results (same players, options and data
+# generation answer instantly)
+BALANCE_CACHE_SIZE = 128
+
+# Option 4 win probability: Elo-style scale of the average MMR edge (400 =
+# 10:1 odds), teammate-pair win rates shrunk toward the players' own win
+# rates by this many virtual games, and the weight of the pair effect
+WIN_PROBABILITY_SCALE = 400
+SYNERGY_PRIOR_GAMES = 10
+SYNERGY_WEIGHT = 1.0
+
+# Incremental player rating (cogs/utils/rating_engine.py), on the MMR scale:
+# per-player performance spread, uncertainty added before each game, and
+# the uncertainty of a new player's tier MMR
+RATING_BETA = 150
+RATING_TAU = 3
+RATING_INITIAL_SIGMA = 300
+
 
 def get_intents():
     """
@@ -178,7 +178,18 @@ async def handle_guild_join(bot, guild):
 
 
 async def handle_bot_shutdown(bot):
-    """Handle bot shutdown."""
+    """Handle bot shutdown - flush pending data writes and stop the balancing pool first."""
+    from cogs.utils.data_manager import guild_stores
+    from cogs.utils.team_commands import shutdown_balance_executor
+    
+    try:
+        await guild_stores.flush_all()
+        bot.logger.info("💾 Pending data changes flushed")
+    except Exception as e:
+        bot.logger.error(f"❌ Failed to flush pending data changes: {e}")
+    
+    shutdown_balance_executor()
+    
     settings.log_bot_shutdown(bot.logger)
 
 